@@ -0,0 +1,103 @@
+"""Helpers shared by the benchmarks, to populate a database and run VaultAPI as a uvicorn subprocess."""
+
+import contextlib
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, Iterator, List, Tuple
+
+import requests
+from cryptography.fernet import Fernet
+
+APIKEY = "Benchmark-ApiKey-0123456789-abcdefghij"
+HEADERS = {"Authorization": f"Bearer {APIKEY}"}
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Rate limit that is never reached, so the benchmarks measure the routes rather than the limiter
+UNLIMITED = [{"max_requests": 10**9, "seconds": 1}]
+
+
+def percentile(samples: list, pct: float) -> float:
+    """Returns the percentile of the samples in milliseconds."""
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return round(ordered[index] * 1000, 3)
+
+
+def populate(database: str, secret: str, tables: List[str], keys: int) -> None:
+    """Fills each of the tables in the database with the given number of keys."""
+    sys.path.insert(0, ROOT)
+    from vaultapi import database as db
+    from vaultapi import models
+
+    models.database = models.Database(database)
+    fernet = Fernet(secret)
+    for table_name in tables:
+        db.create_table(table_name, ["key", "value"])
+        with models.database.writer() as connection:
+            connection.executemany(
+                f'INSERT INTO "{table_name}" (key, value) VALUES (?,?) '
+                "ON CONFLICT(key) DO UPDATE SET value=excluded.value",
+                (
+                    (f"key_{i}", fernet.encrypt(f"value_{i}".encode()))
+                    for i in range(keys)
+                ),
+            )
+    models.database.connection.close()
+
+
+@contextlib.contextmanager
+def serve(
+    directory: str,
+    port: int,
+    secret: str,
+    workers: int = 1,
+    rate_limit: List[Dict[str, int]] = None,
+) -> Iterator[Tuple[subprocess.Popen, str]]:
+    """Runs VaultAPI as a uvicorn subprocess against ``benchmark.db`` in the directory, until the block exits.
+
+    Args:
+        directory: Directory with the database, which is also the working directory of the server.
+        port: Port number for the server.
+        secret: Secret access key that the database was populated with.
+        workers: Number of uvicorn workers.
+        rate_limit: Rate limit of the server, defaults to one that is never reached.
+
+    Yields:
+        Tuple[subprocess.Popen, str]:
+        Yields the server process and its base URL, once it is ready to serve requests.
+    """
+    env = dict(
+        os.environ,
+        APIKEY=APIKEY,
+        SECRET=secret,
+        DATABASE=os.path.join(directory, "benchmark.db"),
+        HOST="127.0.0.1",
+        PORT=str(port),
+        WORKERS=str(workers),
+        PYTHONPATH=ROOT,
+        RATE_LIMIT=json.dumps(rate_limit or UNLIMITED),
+    )
+    server = subprocess.Popen(
+        [sys.executable, "-c", "import vaultapi; vaultapi.start()"],
+        env=env,
+        cwd=directory,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"  # noqa: HttpUrlsUsage
+    try:
+        for _ in range(100):
+            try:
+                requests.get(f"{base_url}/health", timeout=1)
+                break
+            except requests.ConnectionError:
+                time.sleep(0.1)
+        if workers > 1:
+            # give every worker time to finish its startup
+            time.sleep(2)
+        yield server, base_url
+    finally:
+        server.terminate()
+        server.wait()
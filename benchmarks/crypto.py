@@ -0,0 +1,62 @@
+"""Benchmark to compare serial and parallel Fernet throughput of the crypto engine.
+
+Encrypts and decrypts batches of 1k, 10k and 100k secrets, first serially and then split across the crypto
+thread-pool, and reports the throughput (secrets per second) as JSON.
+
+>>> python benchmarks/crypto.py --workers 4
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+from _common import APIKEY, ROOT
+from cryptography.fernet import Fernet
+
+
+def throughput(func, values: list) -> float:
+    """Returns the number of values processed per second."""
+    start = time.perf_counter()
+    func(values)
+    return round(len(values) / (time.perf_counter() - start), 1)
+
+
+def main() -> None:
+    """Runs the benchmark and prints the result as JSON."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000]
+    )
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT)
+    from vaultapi import crypto, models
+
+    models.env = models.EnvConfig(
+        apikey=APIKEY,
+        secret=Fernet.generate_key().decode(),
+        crypto_workers=args.workers,
+        crypto_parallel_threshold=1,
+    )
+    models.session.fernet = Fernet(models.env.secret)
+    pool = crypto.create(args.workers)
+    results = []
+    for size in args.sizes:
+        plaintext = [f"value-{i}-{'x' * 32}" for i in range(size)]
+        ciphertext = crypto.encrypt(plaintext)
+        result = {"secrets": size}
+        for mode, executor in (("serial", None), ("parallel", pool)):
+            models.session.crypto_executor = executor
+            result[mode] = {
+                "encrypt_per_sec": throughput(crypto.encrypt, plaintext),
+                "decrypt_per_sec": throughput(crypto.decrypt, ciphertext),
+            }
+        results.append(result)
+    print(json.dumps({"workers": args.workers, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Benchmark to measure the latency of ``/get-secret`` while a large ``/get-table`` is being served.
+
+Starts VaultAPI as a uvicorn subprocess against a temporary database with a 10k-key table, keeps ``/get-table``
+busy from background threads and reports the latency percentiles of ``/get-secret`` as JSON.
+
+>>> python benchmarks/event_loop.py --keys 10000 --requests 500
+"""
+
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+import requests
+from _common import HEADERS, percentile, populate, serve
+from cryptography.fernet import Fernet
+
+
+def main() -> None:
+    """Runs the benchmark and prints the result as JSON."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--keys", type=int, default=10_000)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--table-clients", type=int, default=2)
+    parser.add_argument("--port", type=int, default=9099)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp()
+    secret = Fernet.generate_key().decode()
+    populate(os.path.join(tmpdir, "benchmark.db"), secret, ["default"], args.keys)
+    with serve(tmpdir, args.port, secret) as (_, base_url):
+        done = threading.Event()
+
+        def table_load() -> None:
+            with requests.Session() as session:
+                while not done.is_set():
+                    session.get(f"{base_url}/get-table", headers=HEADERS)
+
+        threads = [
+            threading.Thread(target=table_load, daemon=True)
+            for _ in range(args.table_clients)
+        ]
+        for thread in threads:
+            thread.start()
+        samples = []
+        with requests.Session() as session:
+            for i in range(args.requests):
+                start = time.perf_counter()
+                response = session.get(
+                    f"{base_url}/get-secret",
+                    params={"key": f"key_{i % args.keys}"},
+                    headers=HEADERS,
+                )
+                samples.append(time.perf_counter() - start)
+                assert response.ok, response.text
+        done.set()
+        for thread in threads:
+            thread.join()
+        print(
+            json.dumps(
+                {
+                    "keys": args.keys,
+                    "requests": args.requests,
+                    "table_clients": args.table_clients,
+                    "get_secret_ms": {
+                        "mean": round(statistics.mean(samples) * 1000, 3),
+                        "p50": percentile(samples, 50),
+                        "p95": percentile(samples, 95),
+                        "p99": percentile(samples, 99),
+                    },
+                },
+                indent=2,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
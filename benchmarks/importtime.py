@@ -0,0 +1,97 @@
+"""Benchmark to measure the import time of the package, and check that the CLI path stays lightweight.
+
+Runs ``python -X importtime`` in a fresh interpreter for each entrypoint, and reports the cumulative import time
+of the package along with the slowest modules as JSON. Exits with a non-zero code if ``import vaultapi`` or
+``import vaultapi.client`` pulls in any of the server dependencies, or the CLI import time exceeds ``--max-ms``.
+
+>>> python benchmarks/importtime.py --max-ms 100
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+from _common import ROOT
+
+# Modules that are only needed to run the server, and must not be imported by the CLI path
+SERVER_MODULES = ("fastapi", "starlette", "uvicorn", "pydantic", "pydantic_settings")
+ENTRYPOINTS = {
+    "cli": "import vaultapi",
+    "server": "import vaultapi.main",
+    "client": "import vaultapi.client",
+}
+
+
+def importtime(statement: str) -> Tuple[List[Tuple[str, int]], List[str]]:
+    """Runs the statement in a fresh interpreter with ``-X importtime``.
+
+    Args:
+        statement: Python statement to be run.
+
+    Returns:
+        Tuple[List[Tuple[str, int]], List[str]]:
+        Returns the cumulative import time in microseconds for each module, and the server modules that were loaded.
+    """
+    check = f"{statement}; import sys; print(','.join(m for m in {SERVER_MODULES!r} if m in sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", check],
+        env=dict(os.environ, PYTHONPATH=ROOT),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    timings = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = line.removeprefix("import time:").split("|")
+        timings.append((module.strip(), int(cumulative)))
+    return timings, list(filter(None, result.stdout.strip().split(",")))
+
+
+def summarize(timings: List[Tuple[str, int]], top: int) -> Dict[str, object]:
+    """Summarizes the import time of the package and its slowest top-level dependencies."""
+    package = next(
+        (cumulative for module, cumulative in timings if module == "vaultapi"), 0
+    )
+    slowest = sorted(
+        ((module, cumulative) for module, cumulative in timings if "." not in module),
+        key=lambda item: item[1],
+        reverse=True,
+    )[:top]
+    return {
+        "vaultapi_ms": round(package / 1000, 2),
+        "total_ms": round(
+            sum(cumulative for module, cumulative in timings if "." not in module)
+            / 1000,
+            2,
+        ),
+        "slowest_ms": {
+            module: round(cumulative / 1000, 2) for module, cumulative in slowest
+        },
+    }
+
+
+def main() -> None:
+    """Runs the benchmark and prints the result as JSON."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--max-ms", type=float, default=100.0)
+    parser.add_argument("--top", type=int, default=5)
+    args = parser.parse_args()
+
+    report = {}
+    for name, statement in ENTRYPOINTS.items():
+        timings, loaded = importtime(statement)
+        report[name] = {**summarize(timings, args.top), "server_modules": loaded}
+    cli, client = report["cli"], report["client"]
+    cli["passed"] = not cli["server_modules"] and cli["vaultapi_ms"] <= args.max_ms
+    client["passed"] = not client["server_modules"]
+    print(json.dumps(report, indent=2))
+    sys.exit(0 if cli["passed"] and client["passed"] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""Load test that drives every secret route at set concurrency levels and compares the results against a baseline.
+
+Starts VaultAPI as a uvicorn subprocess against a temporary database filled with ``--tables`` tables of ``--keys``
+keys each, then runs ``--requests`` requests against each route at every concurrency level. Reports the throughput,
+latency percentiles and error count of each run, along with the peak RSS of the server, as JSON.
+
+>>> python benchmarks/load.py --concurrency 1,8,32 --save baseline.json
+>>> python benchmarks/load.py --concurrency 1,8,32 --baseline baseline.json --tolerance 10
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+import requests
+from _common import HEADERS, percentile, populate, serve
+from cryptography.fernet import Fernet
+
+ROUTES = ("get-secret", "get-secrets", "get-table", "put-secret", "put-secrets")
+
+
+def peak_rss(pid: int) -> int | None:
+    """Returns the peak resident set size in KiB of the process and its children (the uvicorn workers).
+
+    Reads ``VmHWM`` from ``/proc``, so this is only available on Linux.
+    """
+    total, pending = 0, [pid]
+    try:
+        while pending:
+            current = pending.pop()
+            with open(f"/proc/{current}/status") as file:
+                for line in file:
+                    if line.startswith("VmHWM:"):
+                        total += int(line.split()[1])
+            with open(f"/proc/{current}/task/{current}/children") as file:
+                pending.extend(map(int, file.read().split()))
+    except FileNotFoundError:
+        return None
+    return total
+
+
+def make_request(
+    route: str, base_url: str, args: argparse.Namespace
+) -> Callable[[requests.Session], requests.Response]:
+    """Returns a function that sends a single randomized request to the given route."""
+
+    def table() -> str:
+        return f"table_{random.randrange(args.tables)}"
+
+    def keys() -> List[str]:
+        return [f"key_{random.randrange(args.keys)}" for _ in range(args.batch)]
+
+    def call(session: requests.Session) -> requests.Response:
+        if route == "get-secret":
+            return session.get(
+                f"{base_url}/get-secret",
+                params={"key": keys()[0], "table_name": table()},
+                headers=HEADERS,
+            )
+        if route == "get-secrets":
+            return session.get(
+                f"{base_url}/get-secrets",
+                params={"keys": ",".join(set(keys())), "table_name": table()},
+                headers=HEADERS,
+            )
+        if route == "get-table":
+            return session.get(
+                f"{base_url}/get-table",
+                params={"table_name": table()},
+                headers=HEADERS,
+            )
+        if route == "put-secret":
+            return session.put(
+                f"{base_url}/put-secret",
+                json={"key": keys()[0], "value": "updated", "table_name": table()},
+                headers=HEADERS,
+            )
+        return session.put(
+            f"{base_url}/put-secrets",
+            json={
+                "secrets": {key: "updated" for key in keys()},
+                "table_name": table(),
+            },
+            headers=HEADERS,
+        )
+
+    return call
+
+
+def run(
+    call: Callable[[requests.Session], requests.Response],
+    requests_count: int,
+    concurrency: int,
+) -> Dict[str, float]:
+    """Sends the requests from the given number of threads, and summarizes the latencies."""
+    local = threading.local()
+
+    def timed(_: int) -> tuple:
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        start = time.perf_counter()
+        response = call(local.session)
+        return time.perf_counter() - start, response.ok
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(timed, range(requests_count)))
+    elapsed = time.perf_counter() - start
+    samples = [latency for latency, _ in results]
+    return {
+        "requests": requests_count,
+        "errors": sum(not ok for _, ok in results),
+        "throughput_rps": round(requests_count / elapsed, 2),
+        "p50_ms": percentile(samples, 50),
+        "p95_ms": percentile(samples, 95),
+        "p99_ms": percentile(samples, 99),
+    }
+
+
+def compare(
+    results: Dict[str, dict], baseline: Dict[str, dict], tolerance: float
+) -> Dict[str, dict]:
+    """Compares the throughput and p95 latency of each run against the baseline.
+
+    A run regresses when its throughput drops, or its p95 latency rises, by more than ``tolerance`` percent.
+    """
+    comparison = {}
+    for name, result in results.items():
+        if not (before := baseline.get(name)):
+            continue
+        throughput = (result["throughput_rps"] / before["throughput_rps"] - 1) * 100
+        p95 = (result["p95_ms"] / before["p95_ms"] - 1) * 100
+        comparison[name] = {
+            "throughput_change_pct": round(throughput, 2),
+            "p95_change_pct": round(p95, 2),
+            "regressed": throughput < -tolerance or p95 > tolerance,
+        }
+    return comparison
+
+
+def main() -> None:
+    """Runs the load test and prints the result as JSON, exits with a non-zero code on a regression."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tables", type=int, default=4)
+    parser.add_argument("--keys", type=int, default=1_000)
+    parser.add_argument("--batch", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", default="1,8,32")
+    parser.add_argument("--routes", default=",".join(ROUTES))
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--port", type=int, default=9097)
+    parser.add_argument("--save", help="File to store the results as a baseline")
+    parser.add_argument("--baseline", help="File with the results to compare against")
+    parser.add_argument("--tolerance", type=float, default=10.0)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp()
+    secret = Fernet.generate_key().decode()
+    tables = [f"table_{table}" for table in range(args.tables)]
+    populate(os.path.join(tmpdir, "benchmark.db"), secret, tables, args.keys)
+    results = {}
+    with serve(tmpdir, args.port, secret, workers=args.workers) as (server, base_url):
+        for route in args.routes.split(","):
+            call = make_request(route, base_url, args)
+            for concurrency in map(int, args.concurrency.split(",")):
+                results[f"{route}@{concurrency}"] = run(
+                    call, args.requests, concurrency
+                )
+        rss = peak_rss(server.pid)
+    report = {
+        "python": sys.version.split()[0],
+        "tables": args.tables,
+        "keys": args.keys,
+        "batch": args.batch,
+        "workers": args.workers,
+        "peak_rss_kib": rss,
+        "results": results,
+    }
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump(report, file, indent=2)
+    regressed = False
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        report["comparison"] = compare(results, baseline["results"], args.tolerance)
+        regressed = any(each["regressed"] for each in report["comparison"].values())
+    print(json.dumps(report, indent=2))
+    sys.exit(1 if regressed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Check that the configured rate limit holds across the whole server when running multiple uvicorn workers.
+
+Starts VaultAPI as a uvicorn subprocess with several workers, fires a burst of concurrent requests from the same
+client and verifies that no more than ``max_requests`` of them were accepted, regardless of the worker that
+served each request.
+
+>>> python benchmarks/multi_worker.py --workers 4 --max-requests 10
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from _common import HEADERS, serve
+from cryptography.fernet import Fernet
+
+
+def main() -> None:
+    """Runs the check and prints the result as JSON, exits with a non-zero code if the limit was exceeded."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--max-requests", type=int, default=10)
+    parser.add_argument("--seconds", type=int, default=300)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--port", type=int, default=9098)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp()
+    rate_limit = [{"max_requests": args.max_requests, "seconds": args.seconds}]
+    with serve(
+        tmpdir,
+        args.port,
+        Fernet.generate_key().decode(),
+        workers=args.workers,
+        rate_limit=rate_limit,
+    ) as (_, base_url):
+
+        def call(_: int) -> int:
+            return requests.get(
+                f"{base_url}/get-secret", params={"key": "missing"}, headers=HEADERS
+            ).status_code
+
+        with ThreadPoolExecutor(max_workers=32) as pool:
+            statuses = list(pool.map(call, range(args.requests)))
+    accepted = sum(status != 429 for status in statuses)
+    # tokens refill continuously, so allow for the ones added while the burst was running
+    allowance = 1
+    print(
+        json.dumps(
+            {
+                "workers": args.workers,
+                "max_requests": args.max_requests,
+                "requests": args.requests,
+                "accepted": accepted,
+                "rejected": statuses.count(429),
+                "passed": accepted <= args.max_requests + allowance,
+            },
+            indent=2,
+        )
+    )
+    sys.exit(0 if accepted <= args.max_requests + allowance else 1)
+
+
+if __name__ == "__main__":
+    main()
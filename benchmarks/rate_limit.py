@@ -0,0 +1,84 @@
+"""Benchmark to measure the rate limiter's cost per request and memory under a scan from many clients.
+
+Simulates requests from a configurable number of distinct client IPs, then lets the buckets go idle and reports
+the time per check, the peak traced memory and the number of identifiers retained before and after eviction.
+
+>>> python benchmarks/rate_limit.py --clients 100000
+"""
+
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+
+from _common import ROOT
+from fastapi import HTTPException, Request
+
+
+def make_request(host: str) -> Request:
+    """Creates a bare request object for the given client host."""
+    return Request(
+        {
+            "type": "http",
+            "method": "GET",
+            "path": "/get-secret",
+            "headers": [],
+            "client": (host, 0),
+        }
+    )
+
+
+def main() -> None:
+    """Runs the benchmark and prints the result as JSON."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=100_000)
+    parser.add_argument("--requests-per-client", type=int, default=3)
+    parser.add_argument("--max-requests", type=int, default=5)
+    parser.add_argument("--seconds", type=int, default=1)
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT)
+    from vaultapi import models, rate_limit
+
+    limiter = rate_limit.RateLimiter(
+        models.RateLimit(max_requests=args.max_requests, seconds=args.seconds)
+    )
+    requests = [
+        make_request(f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}")
+        for i in range(args.clients)
+    ]
+    tracemalloc.start()
+    rejected = 0
+    start = time.perf_counter()
+    for _ in range(args.requests_per_client):
+        for request in requests:
+            try:
+                limiter.init(request)
+            except HTTPException:
+                rejected += 1
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    retained = len(limiter.buckets)
+    time.sleep(args.seconds)
+    limiter.init(make_request("192.168.0.1"))
+    tracemalloc.stop()
+    checks = args.clients * args.requests_per_client
+    print(
+        json.dumps(
+            {
+                "clients": args.clients,
+                "checks": checks,
+                "rejected": rejected,
+                "usec_per_check": round(elapsed / checks * 1e6, 3),
+                "peak_memory_mb": round(peak / 1024 / 1024, 2),
+                "identifiers_retained": retained,
+                "identifiers_after_idle": len(limiter.buckets),
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""Microbenchmark to compare the handler overhead of raising a response as an exception against returning it.
+
+Calls a FastAPI app in-process through ASGI, so the numbers cover only the routing, the handler and the response
+serialization. Each body is served by a route that raises ``APIResponse`` (the old path) and by a route that returns
+the response directly (the new path), and the script checks that both produce the same status, headers and body.
+Reports the mean time per request in microseconds as JSON, and exits with a non-zero code if the outputs differ.
+
+>>> python benchmarks/responses.py --requests 20000
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import sys
+import time
+from http import HTTPStatus
+from typing import Dict, List, Tuple
+
+from _common import ROOT
+
+
+def build_app(ciphertext: str):
+    """Builds an app with a raising and a returning route for each body."""
+    sys.path.insert(0, ROOT)
+    from fastapi import FastAPI
+
+    from vaultapi import exceptions, responses
+
+    app = FastAPI()
+
+    @app.get("/raise/ok")
+    async def raise_ok():
+        raise exceptions.APIResponse(
+            status_code=HTTPStatus.OK.real, detail=HTTPStatus.OK.phrase
+        )
+
+    @app.get("/return/ok")
+    async def return_ok():
+        return responses.ok()
+
+    @app.get("/raise/not-found")
+    async def raise_not_found():
+        raise exceptions.APIResponse(
+            status_code=HTTPStatus.NOT_FOUND.real, detail=HTTPStatus.NOT_FOUND.phrase
+        )
+
+    @app.get("/return/not-found")
+    async def return_not_found():
+        return responses.not_found()
+
+    @app.get("/raise/transit")
+    async def raise_transit():
+        raise exceptions.APIResponse(
+            status_code=HTTPStatus.OK.real,
+            detail=ciphertext,
+            headers={"Vary": "Accept, X-Transit-Format"},
+        )
+
+    @app.get("/return/transit")
+    async def return_transit():
+        return responses.transit(
+            ciphertext, headers={"Vary": "Accept, X-Transit-Format"}
+        )
+
+    return app
+
+
+async def call(app, path: str) -> Tuple[int, List[Tuple[bytes, bytes]], bytes]:
+    """Sends a single request to the app, and collects the status, headers and body of the response."""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [],
+        "client": ("127.0.0.1", 50000),
+        "server": ("127.0.0.1", 9010),
+    }
+    messages = []
+
+    async def receive() -> dict:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: dict) -> None:
+        messages.append(message)
+
+    await app(scope, receive, send)
+    body = b"".join(m.get("body", b"") for m in messages[1:])
+    return messages[0]["status"], sorted(messages[0]["headers"]), body
+
+
+async def measure(app, path: str, count: int) -> float:
+    """Returns the mean time per request in microseconds."""
+    start = time.perf_counter()
+    for _ in range(count):
+        await call(app, path)
+    return round((time.perf_counter() - start) / count * 1e6, 2)
+
+
+async def run(count: int, size: int) -> Dict[str, dict]:
+    """Runs the raising and returning routes for each body, and compares their outputs."""
+    ciphertext = base64.b64encode(os.urandom(size)).decode()
+    app = build_app(ciphertext)
+    report = {}
+    for name in ("ok", "not-found", "transit"):
+        raised, returned = f"/raise/{name}", f"/return/{name}"
+        # warm up the routing and the exception handlers before timing
+        await measure(app, raised, 100)
+        await measure(app, returned, 100)
+        before = await measure(app, raised, count)
+        after = await measure(app, returned, count)
+        report[name] = {
+            "raise_us": before,
+            "return_us": after,
+            "speedup": round(before / after, 2),
+            "identical": await call(app, raised) == await call(app, returned),
+        }
+    return report
+
+
+def main() -> None:
+    """Runs the benchmark and prints the result as JSON."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--size", type=int, default=4096, help="Ciphertext bytes")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args.requests, args.size))
+    print(json.dumps(report, indent=2))
+    sys.exit(0 if all(each["identical"] for each in report.values()) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,29 +2,148 @@ import base64
 import hashlib
 import json
 import os
+import struct
 import time
-from typing import Any, ByteString, Dict
+import zlib
+from typing import Any, ByteString, Dict, Iterable, Iterator
 
 import requests
 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
 APIKEY = os.environ["APIKEY"]
 
-TRANSIT_TIME_BUCKET = os.environ.get("TRANSIT_TIME_BUCKET", 60)
-TRANSIT_KEY_LENGTH = os.environ.get("TRANSIT_KEY_LENGTH", 60)
+TRANSIT_TIME_BUCKET = int(os.environ.get("TRANSIT_TIME_BUCKET", 60))
+TRANSIT_KEY_LENGTH = int(os.environ.get("TRANSIT_KEY_LENGTH", 32))
 HOST = os.environ.get("HOST", "0.0.0.0")
-PORT = os.environ.get("PORT", 8080)
+PORT = int(os.environ.get("PORT", 9010))
+TRANSIT_COMPRESSION = os.environ.get("TRANSIT_COMPRESSION", "false").lower() == "true"
+
+# Stream frames: length and final flag in the header, sequence number and final flag as associated data
+FRAME_HEADER = struct.Struct(">I?")
+FRAME_AAD = struct.Struct(">Q?")
+
+# Flags in the first byte of a plaintext that is not plain JSON
+FLAG_MSGPACK = 0x01
+FLAG_ZLIB = 0x02
+FLAG_ZSTD = 0x04
+
+# Cipher objects for the current and the next transit time bucket
+CIPHERS: Dict[int, AESGCM] = {}
+
+
+def get_aes_cipher(epoch: int) -> AESGCM:
+    """Get the cipher for a transit time bucket, deriving the key only once per bucket."""
+    if (cipher := CIPHERS.get(epoch)) and epoch + 1 in CIPHERS:
+        return cipher
+    for bucket in list(CIPHERS):
+        if bucket < epoch:
+            del CIPHERS[bucket]
+    for bucket in (epoch, epoch + 1):
+        if bucket not in CIPHERS:
+            hash_object = hashlib.sha256(f"{bucket}.{APIKEY}".encode())
+            CIPHERS[bucket] = AESGCM(hash_object.digest()[:TRANSIT_KEY_LENGTH])
+    return CIPHERS[epoch]
+
+
+def deserialize(plaintext: ByteString) -> Dict[str, Any]:
+    """Deserialize the plaintext, which is plain JSON or prefixed with a flags byte."""
+    if plaintext[:1] == b"{":
+        return json.loads(plaintext)
+    flags, body = plaintext[0], plaintext[1:]
+    if flags & FLAG_ZSTD:
+        body = zstandard.decompress(body)
+    elif flags & FLAG_ZLIB:
+        body = zlib.decompress(body)
+    if flags & FLAG_MSGPACK:
+        return msgpack.unpackb(body)
+    return json.loads(body)
 
 
 def transit_decrypt(ciphertext: str | ByteString) -> Dict[str, Any]:
-    """Decrypt transit encrypted payload."""
+    """Decrypt transit encrypted payload, as a base64 string (JSON response) or raw bytes (binary response)."""
     epoch = int(time.time()) // TRANSIT_TIME_BUCKET
-    hash_object = hashlib.sha256(f"{epoch}.{APIKEY}".encode())
-    aes_key = hash_object.digest()[:TRANSIT_KEY_LENGTH]
     if isinstance(ciphertext, str):
         ciphertext = base64.b64decode(ciphertext)
-    decrypted = AESGCM(aes_key).decrypt(ciphertext[:12], ciphertext[12:], b"")
-    return json.loads(decrypted)
+    decrypted = get_aes_cipher(epoch).decrypt(ciphertext[:12], ciphertext[12:], b"")
+    return deserialize(decrypted)
+
+
+def transit_decrypt_stream(chunks: Iterable[ByteString]) -> Iterator[Dict[str, Any]]:
+    """Decrypt a streamed response, yielding the payload of each frame."""
+    cipher = get_aes_cipher(int(time.time()) // TRANSIT_TIME_BUCKET)
+    buffer = bytearray()
+    sequence = 0
+    for chunk in chunks:
+        buffer.extend(chunk)
+        start = FRAME_HEADER.size
+        while len(buffer) >= start:
+            length, final = FRAME_HEADER.unpack_from(buffer)
+            end = start + length
+            if len(buffer) < end:
+                break
+            frame = bytes(buffer[start:end])
+            del buffer[:end]
+            decrypted = cipher.decrypt(
+                frame[:12], frame[12:], FRAME_AAD.pack(sequence, final)
+            )
+            if final:
+                return
+            sequence += 1
+            yield json.loads(decrypted)
+    raise ValueError("Stream ended before the final frame, response is truncated")
+
+
+def get_table_stream() -> Iterator[Dict[str, Any]]:
+    """Stream the table from the server, with flat memory usage regardless of the table size."""
+    headers = {
+        "accept": "application/octet-stream",
+        "Authorization": f"Bearer {APIKEY}",
+    }
+    params = {
+        "table_name": "default",
+        "stream": "true",
+    }
+    with requests.get(
+        f"http://{HOST}:{PORT}/get-table",  # noqa: HttpUrlsUsage
+        params=params,
+        headers=headers,
+        stream=True,
+    ) as response:
+        assert response.ok, response.text
+        yield from transit_decrypt_stream(response.iter_content(chunk_size=65536))
+
+
+def get_binary() -> bytes:
+    """Get the raw ciphertext from the server, without the base64 and JSON wrapping."""
+    headers = {
+        "accept": "application/octet-stream",
+        "Authorization": f"Bearer {APIKEY}",
+    }
+    if msgpack is not None:
+        headers["X-Transit-Format"] = "msgpack"
+    # opt in to compressing large tables before they are encrypted, zstd is preferred when installed
+    if TRANSIT_COMPRESSION:
+        headers["X-Transit-Encoding"] = "zstd, zlib" if zstandard else "zlib"
+    params = {
+        "table_name": "default",
+    }
+    response = requests.get(
+        f"http://{HOST}:{PORT}/get-table",  # noqa: HttpUrlsUsage
+        params=params,
+        headers=headers,
+    )
+    assert response.ok, response.text
+    return response.content
 
 
 def get_cipher() -> str:
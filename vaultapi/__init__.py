@@ -1,15 +1,31 @@
+"""VaultAPI package, which only loads the server and its dependencies when ``start`` is called.
+
+The CLI is invoked from init containers and health checks, so ``vaultapi --version`` and ``vaultapi keygen``
+should not pay for importing FastAPI, uvicorn and pydantic.
+"""
+
 import sys
+from typing import Any
 
 import click
-from cryptography.fernet import Fernet
 
-from .main import start, version
+from . import version
+
+
+def __getattr__(name: str) -> Any:
+    """Imports the server lazily, when ``vaultapi.start`` is accessed for the first time."""
+    if name == "start":
+        from .main import start
+
+        return start
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 @click.command()
 @click.argument("run", required=False)
 @click.argument("start", required=False)
 @click.argument("keygen", required=False)
+@click.argument("migrate", required=False)
 @click.option("--version", "-V", is_flag=True, help="Prints the version.")
 @click.option("--help", "-H", is_flag=True, help="Prints the help section.")
 @click.option(
@@ -32,6 +48,8 @@ def commandline(*args, **kwargs) -> None:
         "--help | -H": "Prints the help section.",
         "--env | -E": "Environment configuration filepath.",
         "start | run": "Initiates the API server.",
+        "keygen": "Generates a secret key to encrypt the datastore.",
+        "migrate": "Dedupes and re-indexes the tables in an existing database.",
     }
     # weird way to increase spacing to keep all values monotonic
     _longest_key = len(max(options.keys()))
@@ -49,12 +67,25 @@ def commandline(*args, **kwargs) -> None:
         )
         sys.exit(0)
     trigger = (
-        kwargs.get("start") or kwargs.get("run") or kwargs.get("keygen") or ""
+        kwargs.get("start")
+        or kwargs.get("run")
+        or kwargs.get("keygen")
+        or kwargs.get("migrate")
+        or ""
     ).lower()
     if trigger in ("start", "run"):
+        from .main import start
+
         start(env_file=kwargs.get("env"))
         sys.exit(0)
+    elif trigger == "migrate":
+        from .util import migrate
+
+        migrate(env_file=kwargs.get("env"))
+        sys.exit(0)
     elif trigger == "keygen":
+        from cryptography.fernet import Fernet
+
         key = Fernet.generate_key()
         click.secho(
             f"\nStore this as an env var named 'secret' or pass it as kwargs\n\n{key.decode()}\n"
@@ -0,0 +1,117 @@
+"""Module that answers whether a client host is allowed, without expanding IP ranges into individual addresses.
+
+IP addresses, ranges and CIDR blocks (IPv4 and IPv6) are stored as sorted, merged integer intervals and looked up
+with a binary search, so memory stays constant regardless of the width of a range.
+"""
+
+import bisect
+import ipaddress
+from typing import Dict, List, Set, Tuple
+
+
+def parse(entry: str) -> Tuple[int, int, int]:
+    """Parses an IP address, range or CIDR block into an interval.
+
+    Args:
+        entry: IP address (``10.0.0.1``), range (``10.120.1.5-35`` or ``10.0.0.1-10.0.1.255``) or CIDR block
+            (``10.0.0.0/8``, ``fd00::/64``).
+
+    Raises:
+        ValueError:
+        If the entry is not a valid IP address, range or CIDR block.
+
+    Returns:
+        Tuple[int, int, int]:
+        Returns the IP version, and the first and last address of the interval as integers.
+    """
+    entry = entry.strip()
+    if "/" in entry:
+        network = ipaddress.ip_network(entry, strict=False)
+        return (
+            network.version,
+            int(network.network_address),
+            int(network.broadcast_address),
+        )
+    if "-" in entry:
+        start, end = entry.split("-", 1)
+        start = ipaddress.ip_address(start.strip())
+        if start.version == 4 and end.strip().isdigit():
+            # shorthand for the last octet, eg: 10.120.1.5-35
+            end = ".".join(str(start).split(".")[:-1] + [end.strip()])
+        end = ipaddress.ip_address(end.strip())
+        if start.version != end.version or int(start) > int(end):
+            raise ValueError(f"Expected a valid IP range, received {entry!r}")
+        return start.version, int(start), int(end)
+    address = ipaddress.ip_address(entry)
+    return address.version, int(address), int(address)
+
+
+class AllowList:
+    """Allowlist of hostnames and IP intervals.
+
+    >>> AllowList
+
+    """
+
+    def __init__(self):
+        """Instantiates an empty allowlist."""
+        self.hosts: Set[str] = set()
+        self.intervals: Dict[int, List[Tuple[int, int]]] = {4: [], 6: []}
+        self.starts: Dict[int, List[int]] = {4: [], 6: []}
+        self.ends: Dict[int, List[int]] = {4: [], 6: []}
+
+    def add(self, entry: str) -> None:
+        """Adds a hostname, IP address, range or CIDR block to the allowlist.
+
+        Args:
+            entry: Hostname, IP address, range or CIDR block to be allowed.
+        """
+        try:
+            version, start, end = parse(entry)
+        except ValueError:
+            self.hosts.add(entry)
+            return
+        intervals = self.intervals[version]
+        intervals.append((start, end))
+        intervals.sort()
+        # merge overlapping and adjacent intervals
+        merged = [intervals[0]]
+        for start, end in intervals[1:]:
+            if start <= merged[-1][1] + 1:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+            else:
+                merged.append((start, end))
+        self.intervals[version] = merged
+        self.starts[version] = [start for start, _ in merged]
+        self.ends[version] = [end for _, end in merged]
+
+    def __contains__(self, host: str) -> bool:
+        """Checks if the host is allowed.
+
+        Args:
+            host: Hostname or IP address of the client.
+
+        Returns:
+            bool:
+            Returns a boolean flag to indicate whether the host is allowed.
+        """
+        try:
+            address = ipaddress.ip_address(host)
+        except ValueError:
+            return host in self.hosts
+        if address.version == 6 and address.ipv4_mapped:
+            address = address.ipv4_mapped
+        value = int(address)
+        index = bisect.bisect_right(self.starts[address.version], value) - 1
+        return index >= 0 and value <= self.ends[address.version][index]
+
+    def __len__(self) -> int:
+        """Returns the number of hostnames and IP intervals in the allowlist."""
+        return len(self.hosts) + sum(map(len, self.intervals.values()))
+
+    def __repr__(self) -> str:
+        """Returns a summary of the allowlist, without expanding the IP intervals."""
+        return (
+            f"AllowList(hosts={sorted(self.hosts)}, "
+            f"ipv4_intervals={len(self.intervals[4])}, ipv6_intervals={len(self.intervals[6])})"
+        )
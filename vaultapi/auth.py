@@ -11,32 +11,53 @@ LOGGER = logging.getLogger("uvicorn.default")
 SECURITY = HTTPBearer()
 
 
-async def validate(request: Request, apikey: HTTPAuthorizationCredentials) -> None:
-    """Validates the auth request using HTTPBearer.
+def verify_apikey(credentials: str) -> bool:
+    """Compares the bearer token with the API key in constant time.
 
     Args:
-        request: Takes the authorization header token as an argument.
-        apikey: Basic APIKey required for all the routes.
+        credentials: Bearer token from the authorization header.
+
+    Returns:
+        bool:
+        Returns a boolean flag to indicate whether the token matches the API key.
+    """
+    if credentials.startswith("\\"):
+        credentials = bytes(credentials, "utf-8").decode(encoding="unicode_escape")
+    return secrets.compare_digest(credentials, models.env.apikey)
+
+
+def validate_host(request: Request) -> None:
+    """Validates the client host against the allowlist.
+
+    Args:
+        request: Reference to the incoming request object.
 
     Raises:
         APIResponse:
-        - 401: If authorization is invalid.
         - 403: If host address is forbidden.
     """
-    if request.client.host not in models.session.allowed_origins:
+    host = request.client.host if request.client else None
+    if host not in models.session.allowlist:
         LOGGER.info(
-            "Host: %s has been blocked since it is not added to allowed list",
-            request.client.host,
+            "Host: %s has been blocked since it is not added to allowed list", host
         )
-        LOGGER.info(models.session.allowed_origins)
         raise exceptions.APIResponse(
             status_code=HTTPStatus.FORBIDDEN.real, detail=HTTPStatus.FORBIDDEN.phrase
         )
-    if apikey.credentials.startswith("\\"):
-        auth = bytes(apikey.credentials, "utf-8").decode(encoding="unicode_escape")
-    else:
-        auth = apikey.credentials
-    if secrets.compare_digest(auth, models.env.apikey):
+
+
+def validate_apikey(request: Request, apikey: HTTPAuthorizationCredentials) -> None:
+    """Validates the bearer token against the API key.
+
+    Args:
+        request: Reference to the incoming request object.
+        apikey: Basic APIKey required for all the routes.
+
+    Raises:
+        APIResponse:
+        - 401: If authorization is invalid.
+    """
+    if verify_apikey(apikey.credentials):
         LOGGER.debug(
             "Connection received from client-host: %s, host-header: %s, x-fwd-host: %s",
             request.client.host,
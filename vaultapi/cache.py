@@ -0,0 +1,145 @@
+"""Module that caches decrypted secrets in memory to skip the database lookup and Fernet decryption.
+
+Values are held as mutable ``bytearray`` objects, so they can be zeroed when an entry is evicted, expired or
+invalidated, instead of lingering in memory until garbage collection.
+
+Each entry is tagged with the version of its table when it was read, and is only served for that same version.
+Writes from other workers increment the version in the database, so they are never masked by a cached value.
+"""
+
+import collections
+import threading
+import time
+from typing import Dict, Tuple
+
+
+def _zero(buffer: bytearray) -> None:
+    """Overwrites the buffer in place with null bytes."""
+    buffer[:] = bytes(len(buffer))
+
+
+class SecretCache:
+    """LRU cache with a size bound and TTL for decrypted secrets, keyed on ``(table_name, key)``.
+
+    >>> SecretCache
+
+    """
+
+    def __init__(self, max_size: int, ttl: int):
+        """Instantiates the object with the necessary args.
+
+        Args:
+            max_size: Maximum number of secrets to hold in the cache, ``0`` disables caching.
+            ttl: Number of seconds after which a cached secret expires, ``0`` disables caching.
+
+        Attributes:
+            hits: Number of lookups served from the cache.
+            misses: Number of lookups that were not found or had expired.
+            evictions: Number of entries removed to stay within the size bound.
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries: collections.OrderedDict[
+            Tuple[str, str], Tuple[float, int, bytearray]
+        ] = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        """Boolean flag to indicate whether the cache is enabled."""
+        return bool(self.max_size and self.ttl)
+
+    def get(self, table_name: str, key: str, version: int) -> str | None:
+        """Retrieves a secret from the cache.
+
+        Args:
+            table_name: Name of the table where the secret is stored.
+            key: Name of the secret to retrieve.
+            version: Current version of the table.
+
+        Returns:
+            str:
+            Returns the decrypted secret value, or None if it was not cached, has expired or is from another version.
+        """
+        if not self.enabled:
+            return
+        with self.lock:
+            entry = self.entries.get((table_name, key))
+            if entry is None:
+                self.misses += 1
+                return
+            expiry, cached_version, buffer = entry
+            if expiry < time.monotonic() or cached_version != version:
+                del self.entries[(table_name, key)]
+                _zero(buffer)
+                self.misses += 1
+                return
+            self.entries.move_to_end((table_name, key))
+            self.hits += 1
+            return buffer.decode(encoding="UTF-8")
+
+    def put(self, table_name: str, key: str, value: str, version: int) -> None:
+        """Stores a secret in the cache, evicting the least recently used entries beyond the size bound.
+
+        Args:
+            table_name: Name of the table where the secret is stored.
+            key: Name of the secret to be stored.
+            value: Decrypted secret value.
+            version: Version of the table, read in the same transaction as the secret.
+        """
+        if not self.enabled:
+            return
+        with self.lock:
+            if previous := self.entries.pop((table_name, key), None):
+                _zero(previous[2])
+            self.entries[(table_name, key)] = (
+                time.monotonic() + self.ttl,
+                version,
+                bytearray(value, encoding="UTF-8"),
+            )
+            while len(self.entries) > self.max_size:
+                _, (_, _, buffer) = self.entries.popitem(last=False)
+                _zero(buffer)
+                self.evictions += 1
+
+    def invalidate(self, table_name: str, key: str = None) -> None:
+        """Removes a secret or all the secrets in a table from the cache.
+
+        Args:
+            table_name: Name of the table where the secret is stored.
+            key: Name of the secret to be removed, defaults to all the secrets in the table.
+        """
+        with self.lock:
+            if key is not None:
+                if entry := self.entries.pop((table_name, key), None):
+                    _zero(entry[2])
+                return
+            for cache_key in [k for k in self.entries if k[0] == table_name]:
+                _zero(self.entries.pop(cache_key)[2])
+
+    def clear(self) -> None:
+        """Removes all the secrets from the cache."""
+        with self.lock:
+            for _, _, buffer in self.entries.values():
+                _zero(buffer)
+            self.entries.clear()
+
+    def info(self) -> Dict[str, int]:
+        """Returns the size and the hit/miss counters of the cache.
+
+        Returns:
+            Dict[str, int]:
+            Returns the cache statistics.
+        """
+        with self.lock:
+            return {
+                "size": len(self.entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
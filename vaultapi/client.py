@@ -0,0 +1,376 @@
+"""Client to retrieve and decrypt secrets from a VaultAPI server.
+
+Requests share a keep-alive connection pool, and the decrypted secrets are cached locally for ``cache_ttl`` seconds.
+Once a cached entry expires it is revalidated with ``If-None-Match``, so an unchanged table costs a ``304``
+without a payload. Secrets are fetched in batches through ``/get-secrets``, and requests that are rate limited are
+retried after the ``Retry-After`` interval sent by the server.
+
+>>> from vaultapi.client import VaultClient
+>>> client = VaultClient("http://localhost:9010", apikey="...")
+>>> client.get_secrets(["username", "password"])
+"""
+
+import asyncio
+import base64
+import random
+import threading
+import time
+from http import HTTPStatus
+from typing import Any, ByteString, Dict, List, Set, Tuple
+
+import requests
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from requests.adapters import HTTPAdapter
+
+from . import codec
+
+# Maximum number of keys requested in a single call to '/get-secrets', to keep the URL within common limits
+MAX_BATCH = 100
+
+
+class VaultClient:
+    """Synchronous client with a connection pool, a local cache that honours ETags, and retries on 429.
+
+    >>> VaultClient
+
+    See Also:
+        The client is thread-safe, so a single instance can be shared by all the threads in a process.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        apikey: str,
+        transit_key_length: int = 32,
+        transit_time_bucket: int = 60,
+        cache_ttl: float = 60,
+        pool_size: int = 10,
+        max_retries: int = 5,
+        backoff: float = 0.5,
+        timeout: float = 10,
+        compression: bool = False,
+    ):
+        """Instantiates the client with the necessary args.
+
+        Args:
+            url: Base URL of the VaultAPI server.
+            apikey: API key to authenticate the requests and decrypt the responses.
+            transit_key_length: AES key size used by the server for transit encryption.
+            transit_time_bucket: Interval in seconds after which the server rotates the transit key.
+            cache_ttl: Number of seconds to serve the secrets from the local cache, ``0`` revalidates every call.
+            pool_size: Maximum number of keep-alive connections to the server.
+            max_retries: Maximum number of retries for a rate limited request.
+            backoff: Seconds to wait before the first retry, when the server doesn't send ``Retry-After``.
+            timeout: Seconds to wait for the server to respond.
+            compression: Boolean flag to opt in to compressing large payloads before they are encrypted.
+        """
+        self.url = url.rstrip("/")
+        self.apikey = apikey
+        self.transit_key_length = transit_key_length
+        self.transit_time_bucket = transit_time_bucket
+        self.cache_ttl = cache_ttl
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.keyring = codec.KeyRing()
+        self.lock = threading.Lock()
+        # decrypted secrets, along with the ETag for each table or set of keys that was requested
+        self.cache: Dict[
+            Tuple[str, Tuple[str, ...] | None], Tuple[float, str | None, Dict[str, str]]
+        ] = {}
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)  # noqa: HttpUrlsUsage
+        self.session.mount("https://", adapter)
+        self.session.headers.update(
+            {
+                "Authorization": f"Bearer {apikey}",
+                "Accept": "application/octet-stream, application/json",
+                "X-Transit-Format": "msgpack" if codec.msgpack else "json",
+            }
+        )
+        if compression:
+            self.session.headers["X-Transit-Encoding"] = ", ".join(codec.compressions())
+
+    def decrypt(self, ciphertext: str | ByteString) -> Dict[str, Any]:
+        """Decrypts a transit encrypted payload.
+
+        See Also:
+            A payload encrypted right before the transit key rotated is decrypted with the previous key.
+
+        Args:
+            ciphertext: Raw ciphertext from a binary response, or the base64 ``detail`` of a JSON response.
+
+        Returns:
+            Dict[str, Any]:
+            Returns the decrypted payload.
+        """
+        if isinstance(ciphertext, str):
+            ciphertext = base64.b64decode(ciphertext)
+        epoch = int(time.time()) // self.transit_time_bucket
+        cipher = self.keyring.get(epoch, self.apikey, self.transit_key_length)
+        try:
+            decrypted = cipher.decrypt(ciphertext[:12], ciphertext[12:], b"")
+        except InvalidTag:
+            cipher = AESGCM(
+                codec.string_to_aes_key(
+                    f"{epoch - 1}.{self.apikey}", self.transit_key_length
+                )
+            )
+            decrypted = cipher.decrypt(ciphertext[:12], ciphertext[12:], b"")
+        return codec.deserialize(decrypted)
+
+    def request(self, method: str, path: str, **kwargs) -> requests.Response:
+        """Sends a request through the connection pool, retrying when it is rate limited.
+
+        Args:
+            method: HTTP method.
+            path: Path of the route.
+            **kwargs: Keyword arguments for ``requests.Session.request``.
+
+        Raises:
+            HTTPError:
+            If the request is still rate limited after ``max_retries``.
+
+        Returns:
+            requests.Response:
+            Returns the response object.
+        """
+        for attempt in range(self.max_retries + 1):
+            response = self.session.request(
+                method, f"{self.url}{path}", timeout=self.timeout, **kwargs
+            )
+            if response.status_code != HTTPStatus.TOO_MANY_REQUESTS.real:
+                return response
+            if attempt == self.max_retries:
+                break
+            try:
+                delay = float(response.headers["Retry-After"])
+            except (KeyError, ValueError):
+                delay = self.backoff * 2**attempt
+            # jitter to keep the clients that were limited together from retrying together
+            time.sleep(delay + random.uniform(0, self.backoff))
+        response.raise_for_status()
+
+    def fetch(
+        self, table_name: str, keys: Tuple[str, ...] | None
+    ) -> Dict[str, str] | None:
+        """Retrieves a set of secrets or a whole table, revalidating the cached copy with its ETag.
+
+        Args:
+            table_name: Name of the table where the secrets are stored.
+            keys: Keys to retrieve, or None to retrieve the whole table.
+
+        Raises:
+            HTTPError:
+            If the server responds with an error other than 404.
+
+        Returns:
+            Dict[str, str]:
+            Returns the decrypted key-value pairs, or None if none of the secrets were found.
+        """
+        cache_key = (table_name, keys)
+        with self.lock:
+            cached = self.cache.get(cache_key)
+        if cached and cached[0] > time.monotonic():
+            return cached[2]
+        headers = {"If-None-Match": cached[1]} if cached and cached[1] else {}
+        if keys is None:
+            response = self.request(
+                "GET", "/get-table", params={"table_name": table_name}, headers=headers
+            )
+        else:
+            response = self.request(
+                "GET",
+                "/get-secrets",
+                params={"keys": ",".join(keys), "table_name": table_name},
+                headers=headers,
+            )
+        if response.status_code == HTTPStatus.NOT_MODIFIED.real:
+            values = cached[2]
+        elif response.status_code == HTTPStatus.NOT_FOUND.real:
+            return
+        else:
+            response.raise_for_status()
+            if response.headers.get("Content-Type") == "application/octet-stream":
+                values = self.decrypt(response.content)
+            else:
+                values = self.decrypt(response.json()["detail"])
+        with self.lock:
+            self.cache[cache_key] = (
+                time.monotonic() + self.cache_ttl,
+                response.headers.get("ETag"),
+                values,
+            )
+        return values
+
+    def get_secrets(
+        self, keys: List[str], table_name: str = "default"
+    ) -> Dict[str, str]:
+        """Retrieves multiple secrets, in batches of up to ``MAX_BATCH`` keys per request.
+
+        Args:
+            keys: Names of the secrets to retrieve.
+            table_name: Name of the table where the secrets are stored.
+
+        Returns:
+            Dict[str, str]:
+            Returns the key-value pairs for the secrets that were found.
+        """
+        keys = sorted(set(keys))
+        values = {}
+        for start in range(0, len(keys), MAX_BATCH):
+            end = start + MAX_BATCH
+            values.update(self.fetch(table_name, tuple(keys[start:end])) or {})
+        return values
+
+    def get_secret(self, key: str, table_name: str = "default") -> str | None:
+        """Retrieves a single secret.
+
+        Args:
+            key: Name of the secret to retrieve.
+            table_name: Name of the table where the secret is stored.
+
+        Returns:
+            str:
+            Returns the secret value, or None if it was not found.
+        """
+        return self.get_secrets([key], table_name).get(key)
+
+    def get_table(self, table_name: str = "default") -> Dict[str, str]:
+        """Retrieves all the secrets in a table.
+
+        Args:
+            table_name: Name of the table where the secrets are stored.
+
+        Returns:
+            Dict[str, str]:
+            Returns the key-value pairs for all the secrets in the table.
+        """
+        return self.fetch(table_name, None) or {}
+
+    def clear(self) -> None:
+        """Removes all the secrets from the local cache."""
+        with self.lock:
+            self.cache.clear()
+
+    def close(self) -> None:
+        """Closes the connections in the pool."""
+        self.session.close()
+
+    def __enter__(self) -> "VaultClient":
+        """Returns the client to be used as a context manager."""
+        return self
+
+    def __exit__(self, *args) -> None:
+        """Closes the connections in the pool."""
+        self.close()
+
+
+class AsyncVaultClient:
+    """Asynchronous client, that coalesces concurrent lookups into a single ``/get-secrets`` request.
+
+    >>> AsyncVaultClient
+
+    See Also:
+        Requests are sent from a worker thread with the synchronous client, so they never block the event loop.
+        Calls to ``get_secret`` made within ``batch_window`` seconds of each other are fetched together.
+    """
+
+    def __init__(self, *args, batch_window: float = 0.005, **kwargs):
+        """Instantiates the client with the necessary args.
+
+        Args:
+            *args: Positional arguments for ``VaultClient``.
+            batch_window: Seconds to wait for more lookups to batch together.
+            **kwargs: Keyword arguments for ``VaultClient``.
+        """
+        self.client = VaultClient(*args, **kwargs)
+        self.batch_window = batch_window
+        self.pending: Dict[str, Dict[str, List[asyncio.Future]]] = {}
+        # references to the scheduled flushes, so they are not garbage collected before they run
+        self.tasks: Set[asyncio.Task] = set()
+
+    async def flush(self, table_name: str) -> None:
+        """Fetches the pending lookups for a table in a single batch, and resolves their futures.
+
+        Args:
+            table_name: Name of the table where the secrets are stored.
+        """
+        await asyncio.sleep(self.batch_window)
+        pending = self.pending.pop(table_name)
+        try:
+            values = await asyncio.to_thread(
+                self.client.get_secrets, list(pending), table_name
+            )
+        except Exception as error:
+            for futures in pending.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(error)
+            return
+        for key, futures in pending.items():
+            for future in futures:
+                # the caller may have given up on the lookup, e.g. with a timeout
+                if not future.done():
+                    future.set_result(values.get(key))
+
+    async def get_secret(self, key: str, table_name: str = "default") -> str | None:
+        """Retrieves a single secret, batched with the other lookups for the same table.
+
+        Args:
+            key: Name of the secret to retrieve.
+            table_name: Name of the table where the secret is stored.
+
+        Returns:
+            str:
+            Returns the secret value, or None if it was not found.
+        """
+        future = asyncio.get_running_loop().create_future()
+        if table_name not in self.pending:
+            self.pending[table_name] = {}
+            task = asyncio.create_task(self.flush(table_name))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+        self.pending[table_name].setdefault(key, []).append(future)
+        return await future
+
+    async def get_secrets(
+        self, keys: List[str], table_name: str = "default"
+    ) -> Dict[str, str]:
+        """Retrieves multiple secrets, in batches of up to ``MAX_BATCH`` keys per request.
+
+        Args:
+            keys: Names of the secrets to retrieve.
+            table_name: Name of the table where the secrets are stored.
+
+        Returns:
+            Dict[str, str]:
+            Returns the key-value pairs for the secrets that were found.
+        """
+        return await asyncio.to_thread(self.client.get_secrets, keys, table_name)
+
+    async def get_table(self, table_name: str = "default") -> Dict[str, str]:
+        """Retrieves all the secrets in a table.
+
+        Args:
+            table_name: Name of the table where the secrets are stored.
+
+        Returns:
+            Dict[str, str]:
+            Returns the key-value pairs for all the secrets in the table.
+        """
+        return await asyncio.to_thread(self.client.get_table, table_name)
+
+    async def close(self) -> None:
+        """Closes the connections in the pool."""
+        await asyncio.to_thread(self.client.close)
+
+    async def __aenter__(self) -> "AsyncVaultClient":
+        """Returns the client to be used as an asynchronous context manager."""
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        """Closes the connections in the pool."""
+        await self.close()
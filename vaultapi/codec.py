@@ -0,0 +1,193 @@
+"""Module that encodes the transit plaintext, and derives the transit keys.
+
+The plaintext is JSON by default, which always starts with ``{``. Any other format is prefixed with a flags byte
+that describes how the rest of the plaintext is encoded, so the decoding does not depend on how it was requested.
+Large payloads can also be compressed before they are encrypted, since the ciphertext itself does not compress.
+
+This module only depends on ``cryptography``, so the client can use it without loading the server dependencies.
+"""
+
+import hashlib
+import json
+import threading
+import zlib
+from typing import Any, ByteString, Dict, Tuple
+
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Flags in the first byte of a plaintext that is not plain JSON
+FLAG_MSGPACK = 0x01
+FLAG_ZLIB = 0x02
+FLAG_ZSTD = 0x04
+
+
+def string_to_aes_key(input_string: str, key_length: int) -> ByteString:
+    """Hashes the string.
+
+    Args:
+        input_string: String for which an AES hash has to be generated.
+        key_length: AES key size used during encryption.
+
+    See Also:
+        AES supports three key lengths:
+            - 128 bits (16 bytes)
+            - 192 bits (24 bytes)
+            - 256 bits (32 bytes)
+
+    Returns:
+        str:
+        Return the first 16 bytes for the AES key
+    """
+    hash_object = hashlib.sha256(input_string.encode())
+    return hash_object.digest()[:key_length]
+
+
+class KeyRing:
+    """Memoizes the AES-GCM cipher derived for each transit time bucket.
+
+    >>> KeyRing
+
+    See Also:
+        The key only changes once every ``transit_time_bucket`` seconds, so the cipher for the current bucket is
+        derived once and the one for the next bucket is pre-computed, while older buckets are dropped at rollover.
+    """
+
+    def __init__(self):
+        """Instantiates the object with an empty set of ciphers."""
+        self.lock = threading.Lock()
+        self.ciphers: Dict[int, AESGCM] = {}
+        self.source: Tuple[str, int] | None = None
+
+    def get(self, epoch: int, apikey: str, key_length: int) -> AESGCM:
+        """Get the cipher for a time bucket.
+
+        Args:
+            epoch: Transit time bucket.
+            apikey: API key used to derive the AES key.
+            key_length: AES key size used during encryption.
+
+        Returns:
+            AESGCM:
+            Returns the cipher object for the time bucket.
+        """
+        ciphers = self.ciphers
+        if (
+            self.source == (apikey, key_length)
+            and (cipher := ciphers.get(epoch))
+            and epoch + 1 in ciphers
+        ):
+            return cipher
+        with self.lock:
+            if self.source != (apikey, key_length):
+                self.ciphers = {}
+                self.source = (apikey, key_length)
+            ciphers = {
+                bucket: self.ciphers.get(bucket)
+                or AESGCM(string_to_aes_key(f"{bucket}.{apikey}", key_length))
+                for bucket in (epoch, epoch + 1)
+            }
+            self.ciphers = ciphers
+            return ciphers[epoch]
+
+
+def compressions() -> Tuple[str, ...]:
+    """Returns the compression algorithms that are available, in the order of preference."""
+    if zstandard is None:
+        return ("zlib",)
+    return "zstd", "zlib"
+
+
+def negotiate(accepted: str) -> str | None:
+    """Picks the first compression algorithm requested by the client, that is available.
+
+    Args:
+        accepted: Comma separated algorithms from the ``X-Transit-Encoding`` header.
+
+    Returns:
+        str:
+        Returns the name of the algorithm, or None if none of them are available.
+    """
+    available = compressions()
+    for algorithm in accepted.lower().split(","):
+        if (algorithm := algorithm.strip()) in available:
+            return algorithm
+
+
+def serialize(
+    payload: Dict[str, Any],
+    serializer: str = "json",
+    compression: str | None = None,
+    threshold: int = 0,
+) -> bytes:
+    """Serializes the payload into the plaintext to be encrypted.
+
+    Args:
+        payload: Payload to be serialized.
+        serializer: Serializer for the payload, ``json`` or ``msgpack``.
+        compression: Compression algorithm for the serialized payload, ``zlib`` or ``zstd``.
+        threshold: Minimum size in bytes of the serialized payload to be compressed.
+
+    See Also:
+        Falls back to JSON when ``msgpack`` is requested but not installed, and skips the compression when
+        ``zstd`` is requested but not installed, which the client detects from the plaintext itself.
+
+    Returns:
+        bytes:
+        Returns the plain JSON, or the flags byte followed by the serialized payload.
+    """
+    flags = 0
+    if serializer == "msgpack" and msgpack is not None:
+        flags, body = FLAG_MSGPACK, msgpack.packb(payload)
+    else:
+        body = json.dumps(payload).encode()
+    if compression and len(body) >= threshold:
+        if compression == "zlib":
+            flags, body = flags | FLAG_ZLIB, zlib.compress(body)
+        elif compression == "zstd" and zstandard is not None:
+            flags, body = flags | FLAG_ZSTD, zstandard.compress(body)
+    if flags:
+        return bytes([flags]) + body
+    return body
+
+
+def deserialize(plaintext: ByteString) -> Dict[str, Any]:
+    """Deserializes the decrypted plaintext into the payload.
+
+    Args:
+        plaintext: Decrypted plaintext.
+
+    Raises:
+        Raises ``ValueError`` if the payload was serialized or compressed with a library that is not installed.
+
+    Returns:
+        Dict[str, Any]:
+        Returns the payload.
+    """
+    if plaintext[:1] == b"{":
+        return json.loads(plaintext)
+    flags, body = plaintext[0], plaintext[1:]
+    if flags & FLAG_ZSTD:
+        if zstandard is None:
+            raise ValueError(
+                "Payload is compressed with zstandard, which is not installed"
+            )
+        body = zstandard.decompress(body)
+    elif flags & FLAG_ZLIB:
+        body = zlib.decompress(body)
+    if flags & FLAG_MSGPACK:
+        if msgpack is None:
+            raise ValueError(
+                "Payload is serialized with msgpack, which is not installed"
+            )
+        return msgpack.unpackb(body)
+    return json.loads(body)
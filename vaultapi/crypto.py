@@ -0,0 +1,130 @@
+"""Module that encrypts and decrypts batches of secrets with Fernet.
+
+Batches at or above ``crypto_parallel_threshold`` are split into one chunk per thread and processed across a
+dedicated thread-pool, since the AES and HMAC work in ``cryptography`` can run outside the GIL.
+Smaller batches, or a pool size of ``0``, stay serial to avoid the dispatch overhead.
+"""
+
+import functools
+import itertools
+import math
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, TypeVar
+
+from cryptography.fernet import Fernet, InvalidToken
+
+from . import metrics, models
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def create(max_workers: int) -> ThreadPoolExecutor | None:
+    """Creates the thread-pool for the parallel crypto work.
+
+    Args:
+        max_workers: Maximum number of threads in the pool, ``0`` disables parallel crypto.
+
+    Returns:
+        ThreadPoolExecutor:
+        Returns the executor object, or None when parallel crypto is disabled.
+    """
+    if max_workers:
+        return ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="vaultapi-crypto"
+        )
+
+
+def _process(func: Callable[[T], R], values: List[T]) -> List[R]:
+    """Applies the function to each value serially."""
+    return [func(value) for value in values]
+
+
+def _map(func: Callable[[T], R], values: List[T]) -> List[R]:
+    """Applies the function to each value, splitting large batches across the crypto thread-pool.
+
+    Args:
+        func: Function to apply to each value.
+        values: List of values to be processed.
+
+    Returns:
+        List[R]:
+        Returns the processed values in the same order.
+    """
+    pool = models.session.crypto_executor
+    if pool is None or len(values) < models.env.crypto_parallel_threshold:
+        return _process(func, values)
+    size = math.ceil(len(values) / models.env.crypto_workers)
+    futures = []
+    for start in range(0, len(values), size):
+        end = start + size
+        futures.append(pool.submit(_process, func, values[start:end]))
+    return list(itertools.chain.from_iterable(future.result() for future in futures))
+
+
+def _encrypt(value: str) -> bytes:
+    """Encrypts a single value."""
+    return models.session.fernet.encrypt(value.encode(encoding="UTF-8"))
+
+
+def _decrypt(value: bytes) -> str:
+    """Decrypts a single value."""
+    return models.session.fernet.decrypt(value).decode(encoding="UTF-8")
+
+
+@metrics.timed("fernet_encrypt")
+def encrypt(values: List[str]) -> List[bytes]:
+    """Encrypts a batch of secrets to be stored in the database.
+
+    Args:
+        values: List of plain text values.
+
+    Returns:
+        List[bytes]:
+        Returns the encrypted values in the same order.
+    """
+    return _map(_encrypt, values)
+
+
+@metrics.timed("fernet_decrypt")
+def decrypt(values: List[bytes]) -> List[str]:
+    """Decrypts a batch of secrets retrieved from the database.
+
+    Args:
+        values: List of encrypted values.
+
+    Returns:
+        List[str]:
+        Returns the decrypted values in the same order.
+    """
+    return _map(_decrypt, values)
+
+
+def _rotate(primary: Fernet, value: bytes) -> bytes | None:
+    """Re-encrypts a single value with the primary key, unless it is already encrypted with it."""
+    try:
+        # verifies the signature without decrypting, to skip the values that are already rotated
+        primary.extract_timestamp(value)
+        return None
+    except InvalidToken:
+        pass
+    try:
+        return models.session.fernet.rotate(value)
+    except InvalidToken:
+        return None
+
+
+@metrics.timed("fernet_rotate")
+def rotate(values: List[bytes], primary: Fernet) -> List[bytes | None]:
+    """Re-encrypts a batch of secrets with the primary key, preserving their timestamps.
+
+    Args:
+        values: List of encrypted values.
+        primary: Fernet object for the primary key.
+
+    Returns:
+        List[bytes | None]:
+        Returns the re-encrypted values in the same order, None for the values that are already encrypted with the
+        primary key, or cannot be decrypted with any of the keys.
+    """
+    return _map(functools.partial(_rotate, primary), values)
@@ -1,40 +1,317 @@
-from typing import List, Tuple
+import sqlite3
+import time
+from typing import Dict, Iterator, List, Tuple
 
-from . import models
+from . import metrics, models
 
+# Default limit on the number of host parameters in a single SQLite statement (prior to 3.32.0)
+MAX_VARIABLES = 999
+# Prefix for the tables that are used internally, which are not listed or migrated as secret tables
+INTERNAL_PREFIX = "__vaultapi_"
+VERSIONS_TABLE = f"{INTERNAL_PREFIX}versions__"
+CHANGES_TABLE = f"{INTERNAL_PREFIX}changes__"
+META_TABLE = f"{INTERNAL_PREFIX}meta__"
+ROTATION_TABLE = f"{INTERNAL_PREFIX}rotation__"
+# Minimum number of seconds between two compactions of the change log, in each worker
+COMPACTION_INTERVAL = 60
+_last_compaction = 0.0
 
+
+def chunked(keys: List[str]) -> Iterator[List[str]]:
+    """Splits the keys into chunks that fit within the host parameter limit of a single statement.
+
+    Args:
+        keys: List of keys to be split.
+
+    Yields:
+        List[str]:
+        Yields each chunk of keys.
+    """
+    for start in range(0, len(keys), MAX_VARIABLES):
+        end = start + MAX_VARIABLES
+        yield keys[start:end]
+
+
+def _create_internal_tables(cursor: sqlite3.Cursor) -> None:
+    """Creates the tables that hold the versions, the change log, its metadata and the key rotation progress."""
+    cursor.execute(
+        f'CREATE TABLE IF NOT EXISTS "{VERSIONS_TABLE}" '
+        "(table_name TEXT PRIMARY KEY, version INTEGER NOT NULL)"
+    )
+    # AUTOINCREMENT guarantees that a sequence number is never reused, even after the log is compacted
+    cursor.execute(
+        f'CREATE TABLE IF NOT EXISTS "{CHANGES_TABLE}" '
+        "(seq INTEGER PRIMARY KEY AUTOINCREMENT, table_name TEXT NOT NULL, key TEXT, op TEXT NOT NULL, "
+        "ts REAL NOT NULL)"
+    )
+    cursor.execute(
+        f'CREATE INDEX IF NOT EXISTS "idx_{CHANGES_TABLE}_table_name" '
+        f'ON "{CHANGES_TABLE}" (table_name, seq)'
+    )
+    cursor.execute(
+        f'CREATE INDEX IF NOT EXISTS "idx_{CHANGES_TABLE}_ts" ON "{CHANGES_TABLE}" (ts)'
+    )
+    cursor.execute(
+        f'CREATE TABLE IF NOT EXISTS "{META_TABLE}" (name TEXT PRIMARY KEY, value INTEGER NOT NULL)'
+    )
+    cursor.execute(
+        f'CREATE TABLE IF NOT EXISTS "{ROTATION_TABLE}" '
+        "(table_name TEXT PRIMARY KEY, last_rowid INTEGER NOT NULL, rotated INTEGER NOT NULL, "
+        "completed INTEGER NOT NULL)"
+    )
+
+
+def _bump_version(cursor: sqlite3.Cursor, table_name: str) -> None:
+    """Increments the version of a table, within the transaction of the write."""
+    cursor.execute(
+        f'INSERT INTO "{VERSIONS_TABLE}" (table_name, version) VALUES (?, 1) '
+        "ON CONFLICT(table_name) DO UPDATE SET version=version+1",
+        (table_name,),
+    )
+
+
+def _log_changes(
+    cursor: sqlite3.Cursor, table_name: str, keys: List[str | None], op: str
+) -> None:
+    """Appends the changes to the change log, within the transaction of the write.
+
+    Args:
+        cursor: Cursor of the write transaction.
+        table_name: Name of the table that was changed.
+        keys: Keys that were changed, ``None`` for a change to the whole table.
+        op: Operation that was performed, one of ``upsert``, ``delete`` or ``drop``.
+    """
+    timestamp = time.time()
+    cursor.executemany(
+        f'INSERT INTO "{CHANGES_TABLE}" (table_name, key, op, ts) VALUES (?,?,?,?)',
+        ((table_name, key, op, timestamp) for key in keys),
+    )
+    _compact_changes(cursor, timestamp)
+
+
+def _compact_changes(cursor: sqlite3.Cursor, timestamp: float) -> None:
+    """Removes the change log entries beyond the retention, at most once every ``COMPACTION_INTERVAL`` seconds.
+
+    See Also:
+        Entries are removed as a contiguous prefix of sequence numbers, and the last removed sequence number is
+        stored as the floor, below which the log is incomplete.
+
+    Args:
+        cursor: Cursor of the write transaction.
+        timestamp: Current time.
+    """
+    global _last_compaction
+    if (
+        not models.env.changelog_retention
+        or timestamp - _last_compaction < COMPACTION_INTERVAL
+    ):
+        return
+    _last_compaction = timestamp
+    floor = cursor.execute(
+        f'SELECT MAX(seq) FROM "{CHANGES_TABLE}" WHERE ts < ?',
+        (timestamp - models.env.changelog_retention,),
+    ).fetchone()[0]
+    if floor is None:
+        return
+    cursor.execute(f'DELETE FROM "{CHANGES_TABLE}" WHERE seq <= ?', (floor,))
+    cursor.execute(
+        f'INSERT INTO "{META_TABLE}" (name, value) VALUES (?,?) '
+        "ON CONFLICT(name) DO UPDATE SET value=MAX(value, excluded.value)",
+        ("changes_floor", floor),
+    )
+
+
+def create_internal_tables() -> None:
+    """Creates the tables that hold the versions, the change log, its metadata and the key rotation progress."""
+    with models.database.writer() as connection:
+        _create_internal_tables(connection.cursor())
+
+
+@metrics.timed("sqlite")
+def get_changes(table_name: str, since: int) -> List[Tuple[int, str | None, str]]:
+    """Function to retrieve the change log entries of a table, after a sequence number.
+
+    Args:
+        table_name: Name of the table.
+        since: Sequence number after which the changes are retrieved.
+
+    Returns:
+        List[Tuple[int, str | None, str]]:
+        Returns the sequence number, key and operation of each change, in order.
+    """
+    cursor = models.database.reader.cursor()
+    return cursor.execute(
+        f'SELECT seq, key, op FROM "{CHANGES_TABLE}" WHERE table_name=? AND seq > ? ORDER BY seq',
+        (table_name, since),
+    ).fetchall()
+
+
+@metrics.timed("sqlite")
+def get_changes_floor() -> int:
+    """Function to retrieve the last sequence number that was removed from the change log by compaction.
+
+    Returns:
+        int:
+        Returns the sequence number, the log is only complete for the changes after it.
+    """
+    return _get_changes_floor(models.database.reader.cursor())
+
+
+def _get_changes_floor(cursor: sqlite3.Cursor) -> int:
+    """Retrieves the last sequence number that was removed from the change log, with the given cursor."""
+    return _get_meta(cursor, "changes_floor") or 0
+
+
+@metrics.timed("sqlite")
+def get_last_sequence() -> int:
+    """Function to retrieve the sequence number of the latest change.
+
+    Returns:
+        int:
+        Returns the sequence number, or ``0`` if nothing has been changed.
+    """
+    cursor = models.database.reader.cursor()
+    state = cursor.execute(f'SELECT MAX(seq) FROM "{CHANGES_TABLE}"').fetchone()
+    return max(state[0] or 0, _get_changes_floor(cursor))
+
+
+@metrics.timed("sqlite")
+def get_version(table_name: str) -> int:
+    """Function to retrieve the version of a table, which is incremented by every write to the table.
+
+    See Also:
+        Versions are never reset, including when a table is dropped, so a re-created table never repeats a version.
+
+    Args:
+        table_name: Name of the table.
+
+    Returns:
+        int:
+        Returns the version of the table, or ``0`` if it has never been written to.
+    """
+    return _get_version(models.database.reader.cursor(), table_name)
+
+
+def _get_version(cursor: sqlite3.Cursor, table_name: str) -> int:
+    """Retrieves the version of a table with the given cursor."""
+    state = cursor.execute(
+        f'SELECT version FROM "{VERSIONS_TABLE}" WHERE table_name=(?)', (table_name,)
+    ).fetchone()
+    return state[0] if state else 0
+
+
+@metrics.timed("sqlite")
+def get_versions() -> Dict[str, int]:
+    """Function to retrieve the versions of all the tables that have been written to.
+
+    Returns:
+        Dict[str, int]:
+        Returns the version of each table.
+    """
+    cursor = models.database.reader.cursor()
+    return dict(
+        cursor.execute(f'SELECT table_name, version FROM "{VERSIONS_TABLE}"').fetchall()
+    )
+
+
+@metrics.timed("sqlite")
 def table_exists(table_name: str) -> bool:
     """Function to check if a table exists in the database.
 
     Args:
         table_name: Name of the table to check.
     """
-    with models.database.connection:
-        cursor = models.database.connection.cursor()
-        cursor.execute(
-            "SELECT name FROM sqlite_master WHERE type='table' AND name=?",
-            (table_name,),
-        )
-        result = cursor.fetchone()
+    cursor = models.database.reader.cursor()
+    cursor.execute(
+        "SELECT name FROM sqlite_master WHERE type='table' AND name=?",
+        (table_name,),
+    )
+    result = cursor.fetchone()
     if result:
         return True
 
 
+@metrics.timed("sqlite")
+def get_tables() -> List[str]:
+    """Function to list all the user defined tables in the database.
+
+    Returns:
+        List[str]:
+        Returns the names of the tables.
+    """
+    cursor = models.database.reader.cursor()
+    state = cursor.execute(
+        "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'"
+    ).fetchall()
+    return [name for (name,) in state if not name.startswith(INTERNAL_PREFIX)]
+
+
+@metrics.timed("sqlite")
 def create_table(table_name: str, columns: List[str] | Tuple[str]) -> None:
-    """Creates the table with the required columns.
+    """Creates the table with the required columns and a unique index on the first column.
 
     Args:
         table_name: Name of the table that has to be created.
         columns: List of columns that has to be created.
+
+    Raises:
+        IntegrityError:
+        When the table already exists with duplicate keys (legacy schema), which requires ``vaultapi migrate``
     """
-    with models.database.connection:
-        cursor = models.database.connection.cursor()
-        # Use f-string or %s as table names cannot be parametrized
+    with models.database.writer() as connection:
+        _create_table(connection.cursor(), table_name, columns)
+
+
+def _create_table(
+    cursor: sqlite3.Cursor, table_name: str, columns: List[str] | Tuple[str]
+) -> None:
+    """Creates the table with a unique index on the first column, within the transaction of the write."""
+    # Use f-string or %s as table names cannot be parametrized
+    cursor.execute(f"CREATE TABLE IF NOT EXISTS {table_name!r} ({', '.join(columns)})")
+    cursor.execute(
+        f'CREATE UNIQUE INDEX IF NOT EXISTS "idx_{table_name}_{columns[0]}" '
+        f'ON "{table_name}" ({columns[0]})'
+    )
+    _create_internal_tables(cursor)
+
+
+@metrics.timed("sqlite")
+def migrate_table(table_name: str) -> int:
+    """Removes duplicate keys from a legacy table and creates the unique key index.
+
+    See Also:
+        The latest row (highest ``rowid``) for each key is retained, as that was the value served for overwrites.
+
+    Args:
+        table_name: Name of the table to be migrated.
+
+    Returns:
+        int:
+        Returns the number of duplicate rows that were removed.
+    """
+    with models.database.writer() as connection:
+        cursor = connection.cursor()
+        cursor.execute(
+            f'DELETE FROM "{table_name}" WHERE rowid NOT IN '
+            f'(SELECT MAX(rowid) FROM "{table_name}" GROUP BY key)'
+        )
+        removed = cursor.rowcount
         cursor.execute(
-            f"CREATE TABLE IF NOT EXISTS {table_name!r} ({', '.join(columns)})"
+            f'CREATE UNIQUE INDEX IF NOT EXISTS "idx_{table_name}_key" ON "{table_name}" (key)'
         )
+        _bump_version(cursor, table_name)
+    models.cache.invalidate(table_name)
+    return removed
+
+
+def vacuum() -> None:
+    """Rebuilds the database file to reclaim the space left behind by removed rows."""
+    # VACUUM cannot run inside a transaction, so only the writer lock is acquired
+    with models.database.lock:
+        models.database.connection.execute("VACUUM")
 
 
+@metrics.timed("sqlite")
 def get_secret(key: str, table_name: str) -> str | None:
     """Function to retrieve secret from database.
 
@@ -46,15 +323,63 @@ def get_secret(key: str, table_name: str) -> str | None:
         str:
         Returns the secret value.
     """
-    with models.database.connection:
-        cursor = models.database.connection.cursor()
-        state = cursor.execute(
-            f'SELECT value FROM "{table_name}" WHERE key=(?)', (key,)
-        ).fetchone()
+    cursor = models.database.reader.cursor()
+    state = cursor.execute(
+        f'SELECT value FROM "{table_name}" WHERE key=(?)', (key,)
+    ).fetchone()
     if state and state[0]:
         return state[0]
 
 
+@metrics.timed("sqlite")
+def get_secrets(keys: List[str], table_name: str) -> Dict[str, str]:
+    """Function to retrieve multiple secrets from database, with a single query for each chunk of keys.
+
+    Args:
+        keys: Names of the secrets to retrieve.
+        table_name: Name of the table where the secrets are stored.
+
+    Returns:
+        Dict[str, str]:
+        Returns the key-value pairs for the secrets that were found.
+    """
+    return _get_secrets(models.database.reader.cursor(), keys, table_name)
+
+
+def _get_secrets(
+    cursor: sqlite3.Cursor, keys: List[str], table_name: str
+) -> Dict[str, str]:
+    """Retrieves multiple secrets with the given cursor, with a single query for each chunk of keys."""
+    values = {}
+    for chunk in chunked(keys):
+        state = cursor.execute(
+            f'SELECT key, value FROM "{table_name}" WHERE key IN ({", ".join("?" * len(chunk))})',
+            chunk,
+        ).fetchall()
+        values.update((key, value) for key, value in state if value)
+    return values
+
+
+@metrics.timed("sqlite")
+def get_versioned_secrets(
+    keys: List[str], table_name: str
+) -> Tuple[int, Dict[str, str]]:
+    """Function to retrieve multiple secrets along with the version of the table, from a single read transaction.
+
+    Args:
+        keys: Names of the secrets to retrieve.
+        table_name: Name of the table where the secrets are stored.
+
+    Returns:
+        Tuple[int, Dict[str, str]]:
+        Returns the version of the table, and the key-value pairs for the secrets that were found.
+    """
+    with models.database.snapshot() as connection:
+        cursor = connection.cursor()
+        return _get_version(cursor, table_name), _get_secrets(cursor, keys, table_name)
+
+
+@metrics.timed("sqlite")
 def get_table(table_name: str) -> List[Tuple[str, str]]:
     """Function to retrieve all key-value pairs from a particular table in the database.
 
@@ -65,29 +390,93 @@ def get_table(table_name: str) -> List[Tuple[str, str]]:
         str:
         Returns the secret value.
     """
-    with models.database.connection:
-        cursor = models.database.connection.cursor()
-        state = cursor.execute(f'SELECT * FROM "{table_name}"').fetchall()
+    cursor = models.database.reader.cursor()
+    state = cursor.execute(f'SELECT * FROM "{table_name}"').fetchall()
     return state
 
 
+def iter_table(table_name: str, batch_size: int) -> Iterator[List[Tuple[str, str]]]:
+    """Function to iterate over all key-value pairs in a table, in batches with a cursor.
+
+    See Also:
+        Uses a dedicated read-only connection, since the iterator may be consumed across threads,
+        which is closed once the iterator is exhausted or discarded.
+
+    Args:
+        table_name: Name of the table where the secrets are stored.
+        batch_size: Number of rows to fetch in each batch.
+
+    Yields:
+        List[Tuple[str, str]]:
+        Yields each batch of key-value pairs.
+    """
+    connection = models.database.connect(readonly=True)
+    try:
+        cursor = connection.execute(f'SELECT key, value FROM "{table_name}"')
+        while rows := cursor.fetchmany(batch_size):
+            yield rows
+    finally:
+        connection.close()
+
+
+@metrics.timed("sqlite")
 def put_secret(key: str, value: str, table_name: str) -> None:
-    """Function to add secret to the database.
+    """Function to add or overwrite a secret in the database.
 
     Args:
         key: Name of the secret to be stored.
         value: Value of the secret to be stored
         table_name: Name of the table where the secret is stored.
     """
-    with models.database.connection:
-        cursor = models.database.connection.cursor()
+    with models.database.writer() as connection:
+        cursor = connection.cursor()
         cursor.execute(
-            f'INSERT INTO "{table_name}" (key, value) VALUES (?,?)',
+            f'INSERT INTO "{table_name}" (key, value) VALUES (?,?) '
+            "ON CONFLICT(key) DO UPDATE SET value=excluded.value",
             (key, value),
         )
-        models.database.connection.commit()
+        _bump_version(cursor, table_name)
+        _log_changes(cursor, table_name, [key], "upsert")
+    models.cache.invalidate(table_name, key)
+
+
+@metrics.timed("sqlite")
+def put_secrets(secrets: Dict[str, str], table_name: str) -> Tuple[int, int]:
+    """Function to add or overwrite multiple secrets in the database, within a single transaction.
+
+    See Also:
+        The write is atomic, so either all the secrets are stored or none of them are.
+
+    Args:
+        secrets: Key-value pairs of the secrets to be stored.
+        table_name: Name of the table where the secrets are stored.
+
+    Returns:
+        Tuple[int, int]:
+        Returns the number of secrets that were inserted and updated.
+    """
+    keys = list(secrets)
+    with models.database.writer() as connection:
+        cursor = connection.cursor()
+        updated = 0
+        for chunk in chunked(keys):
+            updated += cursor.execute(
+                f'SELECT COUNT(*) FROM "{table_name}" WHERE key IN ({", ".join("?" * len(chunk))})',
+                chunk,
+            ).fetchone()[0]
+        cursor.executemany(
+            f'INSERT INTO "{table_name}" (key, value) VALUES (?,?) '
+            "ON CONFLICT(key) DO UPDATE SET value=excluded.value",
+            secrets.items(),
+        )
+        _bump_version(cursor, table_name)
+        _log_changes(cursor, table_name, keys, "upsert")
+    for key in keys:
+        models.cache.invalidate(table_name, key)
+    return len(keys) - updated, updated
 
 
+@metrics.timed("sqlite")
 def remove_secret(key: str, table_name: str) -> None:
     """Function to remove a secret from the database.
 
@@ -95,19 +484,215 @@ def remove_secret(key: str, table_name: str) -> None:
         key: Name of the secret to be removed.
         table_name: Name of the table where the secret is stored.
     """
-    with models.database.connection:
-        cursor = models.database.connection.cursor()
+    with models.database.writer() as connection:
+        cursor = connection.cursor()
         cursor.execute(f'DELETE FROM "{table_name}" WHERE key=(?)', (key,))
-        models.database.connection.commit()
+        removed = cursor.rowcount
+        _bump_version(cursor, table_name)
+        if removed:
+            _log_changes(cursor, table_name, [key], "delete")
+    models.cache.invalidate(table_name, key)
 
 
+@metrics.timed("sqlite")
 def drop_table(table_name: str) -> None:
     """Function to drop a table from the database.
 
     Args:
         table_name: Name of the table to be dropped.
     """
-    with models.database.connection:
-        cursor = models.database.connection.cursor()
+    with models.database.writer() as connection:
+        cursor = connection.cursor()
+        cursor.execute(f'DROP TABLE IF EXISTS "{table_name}"')
+        _bump_version(cursor, table_name)
+        _log_changes(cursor, table_name, [None], "drop")
+    models.cache.invalidate(table_name)
+
+
+@metrics.timed("sqlite")
+def replace_table(table_name: str, secrets: Dict[str, str]) -> None:
+    """Function to replace a table with a new set of secrets, within a single transaction.
+
+    See Also:
+        The existing table is dropped and re-created, so if storing the secrets fails, the table is left as it was.
+
+    Args:
+        table_name: Name of the table to be replaced.
+        secrets: Key-value pairs of the secrets to be stored.
+    """
+    with models.database.writer() as connection:
+        cursor = connection.cursor()
         cursor.execute(f'DROP TABLE IF EXISTS "{table_name}"')
-        models.database.connection.commit()
+        _log_changes(cursor, table_name, [None], "drop")
+        _create_table(cursor, table_name, ["key", "value"])
+        cursor.executemany(
+            f'INSERT INTO "{table_name}" (key, value) VALUES (?,?)', secrets.items()
+        )
+        _bump_version(cursor, table_name)
+        _log_changes(cursor, table_name, list(secrets), "upsert")
+    models.cache.invalidate(table_name)
+
+
+def _get_meta(cursor: sqlite3.Cursor, name: str) -> int | None:
+    """Retrieves a value from the metadata table."""
+    state = cursor.execute(
+        f'SELECT value FROM "{META_TABLE}" WHERE name=?', (name,)
+    ).fetchone()
+    return state[0] if state else None
+
+
+def _set_meta(cursor: sqlite3.Cursor, name: str, value: int) -> None:
+    """Stores a value in the metadata table."""
+    cursor.execute(
+        f'INSERT INTO "{META_TABLE}" (name, value) VALUES (?,?) '
+        "ON CONFLICT(name) DO UPDATE SET value=excluded.value",
+        (name, value),
+    )
+
+
+def _renew_rotation_lease(cursor: sqlite3.Cursor, owner: int, ttl: int) -> bool:
+    """Takes or extends the key rotation lease, if it is free, expired or already held by the owner."""
+    now = int(time.time())
+    holder = _get_meta(cursor, "rotation_lease_owner")
+    expiry = _get_meta(cursor, "rotation_lease_expiry") or 0
+    if holder not in (None, owner) and expiry > now:
+        return False
+    _set_meta(cursor, "rotation_lease_owner", owner)
+    _set_meta(cursor, "rotation_lease_expiry", now + ttl)
+    return True
+
+
+@metrics.timed("sqlite")
+def acquire_rotation_lease(owner: int, ttl: int, key_id: int) -> bool:
+    """Function to acquire the lease that allows a single worker to run the key rotation.
+
+    See Also:
+        The progress is reset when the primary key differs from the one it was recorded for,
+        since the rows rotated to an earlier key have to be rotated again.
+
+    Args:
+        owner: Identifier of the worker.
+        ttl: Number of seconds after which the lease expires, unless it is renewed.
+        key_id: Identifier of the primary key that the rows are rotated to.
+
+    Returns:
+        bool:
+        Returns a boolean flag to indicate whether the lease was acquired.
+    """
+    with models.database.writer() as connection:
+        cursor = connection.cursor()
+        if not _renew_rotation_lease(cursor, owner, ttl):
+            return False
+        if _get_meta(cursor, "rotation_key") != key_id:
+            cursor.execute(f'DELETE FROM "{ROTATION_TABLE}"')
+            _set_meta(cursor, "rotation_key", key_id)
+        return True
+
+
+@metrics.timed("sqlite")
+def release_rotation_lease(owner: int) -> None:
+    """Function to release the key rotation lease, if it is held by the owner.
+
+    Args:
+        owner: Identifier of the worker.
+    """
+    with models.database.writer() as connection:
+        cursor = connection.cursor()
+        if _get_meta(cursor, "rotation_lease_owner") == owner:
+            _set_meta(cursor, "rotation_lease_expiry", 0)
+
+
+@metrics.timed("sqlite")
+def get_rotation() -> Dict[str, Tuple[int, int, bool]]:
+    """Function to retrieve the key rotation progress of each table.
+
+    Returns:
+        Dict[str, Tuple[int, int, bool]]:
+        Returns the last rowid that was checked, the number of rows that were rotated and the completion flag.
+    """
+    cursor = models.database.reader.cursor()
+    state = cursor.execute(
+        f'SELECT table_name, last_rowid, rotated, completed FROM "{ROTATION_TABLE}"'
+    ).fetchall()
+    return {
+        table_name: (last_rowid, rotated, bool(completed))
+        for table_name, last_rowid, rotated, completed in state
+    }
+
+
+@metrics.timed("sqlite")
+def get_rotation_lease_expiry() -> int:
+    """Function to retrieve the time at which the key rotation lease expires.
+
+    Returns:
+        int:
+        Returns the expiry as a UNIX timestamp, ``0`` if the lease is not held.
+    """
+    cursor = models.database.reader.cursor()
+    return _get_meta(cursor, "rotation_lease_expiry") or 0
+
+
+@metrics.timed("sqlite")
+def get_rotation_batch(
+    table_name: str, after: int, limit: int
+) -> List[Tuple[int, bytes]]:
+    """Function to retrieve the next batch of rows to be rotated, in the order of their rowid.
+
+    Args:
+        table_name: Name of the table.
+        after: Rowid after which the rows are retrieved.
+        limit: Maximum number of rows to retrieve.
+
+    Returns:
+        List[Tuple[int, bytes]]:
+        Returns the rowid and the encrypted value of each row.
+    """
+    cursor = models.database.reader.cursor()
+    return cursor.execute(
+        f'SELECT rowid, value FROM "{table_name}" WHERE rowid > ? ORDER BY rowid LIMIT ?',
+        (after, limit),
+    ).fetchall()
+
+
+@metrics.timed("sqlite")
+def put_rotation_batch(
+    table_name: str,
+    updates: List[Tuple[bytes, int, bytes]],
+    last_rowid: int,
+    completed: bool,
+    owner: int,
+    ttl: int,
+) -> bool:
+    """Function to store a batch of rotated values, along with the checkpoint, within a single transaction.
+
+    See Also:
+        - A value is only replaced if it is unchanged since it was read, so a concurrent write is never overwritten.
+        - The versions and the change log are left as they are, since the secret values remain the same.
+
+    Args:
+        table_name: Name of the table.
+        updates: Rotated value, rowid and the value that was read, for each row to be updated.
+        last_rowid: Rowid of the last row in the batch.
+        completed: Boolean flag to indicate that this is the last batch of the table.
+        owner: Identifier of the worker, that has to hold the lease.
+        ttl: Number of seconds to extend the lease by.
+
+    Returns:
+        bool:
+        Returns a boolean flag to indicate whether the batch was stored, ``False`` when the lease was lost.
+    """
+    with models.database.writer() as connection:
+        cursor = connection.cursor()
+        if not _renew_rotation_lease(cursor, owner, ttl):
+            return False
+        cursor.executemany(
+            f'UPDATE "{table_name}" SET value=? WHERE rowid=? AND value=?', updates
+        )
+        rotated = cursor.rowcount
+        cursor.execute(
+            f'INSERT INTO "{ROTATION_TABLE}" (table_name, last_rowid, rotated, completed) VALUES (?,?,?,?) '
+            "ON CONFLICT(table_name) DO UPDATE SET last_rowid=excluded.last_rowid, "
+            "rotated=rotated+excluded.rotated, completed=excluded.completed",
+            (table_name, last_rowid, rotated, completed),
+        )
+        return True
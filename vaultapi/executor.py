@@ -0,0 +1,51 @@
+"""Module that offloads blocking storage and crypto work from the event loop.
+
+SQLite queries and Fernet/AES operations are synchronous, so they are dispatched to a bounded thread-pool
+to keep a slow disk read or a large decrypt from stalling every other request in the uvicorn worker.
+"""
+
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+from . import models
+
+T = TypeVar("T")
+
+
+def create(max_workers: int) -> ThreadPoolExecutor:
+    """Creates the bounded thread-pool executor for storage and crypto work.
+
+    Args:
+        max_workers: Maximum number of threads in the pool.
+
+    Returns:
+        ThreadPoolExecutor:
+        Returns the executor object.
+    """
+    return ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="vaultapi")
+
+
+async def run(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Runs a blocking function in the executor and awaits the result.
+
+    Args:
+        func: Blocking function to be executed.
+        *args: Positional arguments for the function.
+        **kwargs: Keyword arguments for the function.
+
+    See Also:
+        The function runs in a copy of the current context, so the stage timings of the request are recorded.
+
+    Returns:
+        T:
+        Returns the value returned by the function.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+        models.session.executor,
+        functools.partial(context.run, func, *args, **kwargs),
+    )
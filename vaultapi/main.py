@@ -1,14 +1,35 @@
+import json
 import logging
+import os
 import pathlib
+import sqlite3
+import tempfile
 
 import uvicorn
-from cryptography.fernet import Fernet
+from cryptography.fernet import Fernet, MultiFernet
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from . import database, models, routes, squire, version
+from . import (
+    cache,
+    crypto,
+    database,
+    executor,
+    metrics,
+    middleware,
+    models,
+    profiler,
+    rate_limit,
+    rotation,
+    routes,
+    squire,
+    version,
+)
+from .allowlist import AllowList
 
 LOGGER = logging.getLogger("uvicorn.default")
+# Environment variable with the path to the file that shares the loaded configuration with the uvicorn workers
+WORKER_ENV = "VAULTAPI_WORKER_ENV"
 VaultAPI = FastAPI(
     title="VaultAPI",
     description="Lightweight service to serve secrets and environment variables",
@@ -19,23 +40,102 @@ VaultAPI = FastAPI(
 def __init__(**kwargs) -> None:
     """Instantiates the env, session and database connections."""
     models.env = squire.load_env(**kwargs)
-    models.session.fernet = Fernet(models.env.secret)
-    models.database = models.Database(models.env.database)
+    # new secrets are encrypted with the primary key, while the previous keys can still decrypt the older ones
+    models.session.fernet = MultiFernet(
+        [Fernet(key) for key in (models.env.secret, *models.env.previous_secrets)]
+    )
+    models.session.executor = executor.create(models.env.executor_workers)
+    models.session.crypto_executor = crypto.create(models.env.crypto_workers)
+    models.cache = cache.SecretCache(
+        max_size=models.env.secret_cache_size, ttl=models.env.secret_cache_ttl
+    )
+    models.database = models.Database(
+        models.env.database,
+        mmap_size=models.env.database_mmap_size,
+        cache_size=models.env.database_cache_size,
+    )
+    database.create_internal_tables()
+    if models.env.workers > 1:
+        # Rate limit counters are stored in a separate database, shared by all the workers
+        models.state = models.Database(
+            str(pathlib.Path(models.env.database).with_suffix(".state.db")),
+            mmap_size=0,
+            cache_size=models.env.database_cache_size,
+        )
     default_allowed = ("0.0.0.0", "127.0.0.1", "localhost")
     if models.env.host in default_allowed:
-        models.session.allowed_origins.update(default_allowed)
+        for host in default_allowed:
+            models.session.allowlist.add(host)
     else:
-        models.session.allowed_origins.add(models.env.host)
+        models.session.allowlist.add(models.env.host)
     for allowed in models.env.allowed_origins:
-        models.session.allowed_origins.add(allowed.host)
-    for cidr_range in models.env.allowed_ip_range:
-        LOGGER.info("Adding the IP range: %s to allowed_origins", cidr_range)
-        ip_notion = ".".join(cidr_range.split(".")[0:-1])
-        start_ip, end_ip = cidr_range.split(".")[-1].split("-")
-        start_ip, end_ip = int(start_ip), int(end_ip) + 1
-        for i in range(start_ip, end_ip):
-            models.session.allowed_origins.add(f"{ip_notion}.{i}")
-    LOGGER.info("Allowed origins: %s", models.session.allowed_origins)
+        models.session.allowlist.add(allowed.host)
+    for ip_range in models.env.allowed_ip_range:
+        LOGGER.info("Adding the IP range: %s to allowed_origins", ip_range)
+        models.session.allowlist.add(ip_range)
+    LOGGER.info("Allowed origins: %s", models.session.allowlist)
+    if models.env.metrics_allowlist:
+        models.session.metrics_allowlist = AllowList()
+        for entry in models.env.metrics_allowlist:
+            models.session.metrics_allowlist.add(entry)
+
+
+def enable_gate() -> None:
+    """Adds the pre-auth gate, which applies the allowlist, rate limits and API key to all non-public paths."""
+    public_paths = {
+        "/",
+        "/health",
+        VaultAPI.docs_url,
+        VaultAPI.redoc_url,
+        VaultAPI.openapi_url,
+        VaultAPI.swagger_ui_oauth2_redirect_url,
+    }
+    # metrics are guarded by their own allowlist when one is set, or by the API key otherwise
+    if models.session.metrics_allowlist:
+        public_paths.add("/metrics")
+    models.session.rate_limiters = [
+        rate_limit.get_rate_limiter(each_rate_limit)
+        for each_rate_limit in models.env.rate_limit
+    ]
+    VaultAPI.add_middleware(
+        middleware.PreAuthGate,  # noqa: PyTypeChecker
+        limiters=models.session.rate_limiters,
+        public_paths=public_paths - {None},
+    )
+
+
+def enable_metrics() -> None:
+    """Adds the middleware that records the count, status and latency of each request."""
+    VaultAPI.add_middleware(
+        metrics.MetricsMiddleware,  # noqa: PyTypeChecker
+        paths=[route.path for route in VaultAPI.routes],
+    )
+    if models.env.server_timing:
+        LOGGER.info("Adding Server-Timing headers to the responses")
+        VaultAPI.add_middleware(metrics.ServerTimingMiddleware)  # noqa: PyTypeChecker
+
+
+def enable_profiler() -> None:
+    """Adds the middleware that profiles a sample of the requests, if enabled."""
+    if not models.env.profile_sample_rate:
+        return
+    os.makedirs(models.env.profile_directory, exist_ok=True)
+    LOGGER.info(
+        "Profiling 1 in %d requests to %s",
+        models.env.profile_sample_rate,
+        models.env.profile_directory,
+    )
+    VaultAPI.add_middleware(
+        profiler.ProfilerMiddleware,  # noqa: PyTypeChecker
+        sample_rate=models.env.profile_sample_rate,
+        directory=str(models.env.profile_directory),
+    )
+
+
+def enable_rotation() -> None:
+    """Schedules the job that re-encrypts the secrets with the primary key, if there are previous keys."""
+    VaultAPI.add_event_handler("startup", rotation.start)
+    VaultAPI.add_event_handler("shutdown", rotation.stop)
 
 
 def enable_cors() -> None:
@@ -69,24 +169,91 @@ def start(**kwargs) -> None:
         env_file: Env filepath to load the environment variables.
         apikey: API Key to authenticate the server.
         secret: Secret access key to access the secret content.
+        previous_secrets: Previous secret access keys, to decrypt the secrets until they are rotated to ``secret``.
+        rotation_rate: Maximum number of secrets to rotate to ``secret`` per second, ``0`` disables the rotation.
+        rotation_batch_size: Number of secrets to rotate in each write transaction.
         host: Hostname for the API server.
         port: Port number for the API server.
         workers: Number of workers for the uvicorn server.
         database: FilePath to store the auth database that handles the authentication errors.
+        database_mmap_size: Maximum number of bytes of the database file to memory-map for reads.
+        database_cache_size: SQLite page cache size for each connection, negative values are in KiB.
+        executor_workers: Number of threads for the blocking storage and crypto work in each worker.
+        crypto_workers: Number of threads to split large encrypt/decrypt batches across, 0 keeps them serial.
+        crypto_parallel_threshold: Minimum batch size to split across the crypto threads.
+        stream_batch_size: Number of secrets to encrypt in each frame of a streamed response.
+        transit_compression_threshold: Minimum size in bytes of a payload to compress, when the client opts in.
+        secret_cache_size: Maximum number of decrypted secrets to cache in each worker.
+        secret_cache_ttl: Number of seconds after which a cached secret expires.
         rate_limit: List of dictionaries with ``max_requests`` and ``seconds`` to apply as rate limit.
+        metrics_allowlist: IP ranges, CIDR blocks or addresses allowed to scrape ``/metrics`` without the API key.
+        changelog_retention: Seconds to retain the change log entries for ``/changes``, ``0`` retains them forever.
+        watch_poll_interval: Seconds between polls for writes from other workers, while ``/watch`` has clients.
+        watch_heartbeat: Seconds of inactivity after which a heartbeat is sent to the ``/watch`` clients.
+        server_timing: Boolean flag to add the time spent in each stage as a ``Server-Timing`` response header.
+        profile_sample_rate: Profile one in every N requests with cProfile, ``0`` disables profiling.
+        profile_directory: Directory to store the profile stats of the sampled requests.
         log_config: Logging configuration as a dict or a FilePath. Supports .yaml/.yml, .json or .ini formats.
     """
     __init__(**kwargs)
-    database.create_table("default", ["key", "value"])
+    # tables created before the unique key index was introduced are indexed here, unless they have duplicate keys
+    table_name = "default"
+    try:
+        database.create_table(table_name, ["key", "value"])
+        for table_name in database.get_tables():
+            database.create_table(table_name, ["key", "value"])
+    except sqlite3.IntegrityError as error:
+        LOGGER.critical(
+            "%s - Table '%s' was created with a legacy schema, run 'vaultapi migrate' to dedupe and re-index",
+            error,
+            table_name,
+        )
+        raise
     module_name = pathlib.Path(__file__)
-    enable_cors()
-    VaultAPI.routes.extend(routes.get_all_routes())
     kwargs = dict(
         host=models.env.host,
         port=models.env.port,
         workers=models.env.workers,
-        app=f"{module_name.parent.stem}.{module_name.stem}:{VaultAPI.title}",
+        app=f"{module_name.parent.stem}.{module_name.stem}:{create_app.__name__}",
+        factory=True,
     )
     if models.env.log_config:
         kwargs["log_config"] = models.env.log_config
-    uvicorn.run(**kwargs)
+    if models.env.workers == 1:
+        uvicorn.run(**kwargs)
+        return
+    # Workers are spawned as new processes, which load the configuration from a file that only the owner can read,
+    # so the secrets are neither exposed through the process environment nor inherited by unrelated children
+    descriptor, filepath = tempfile.mkstemp(prefix="vaultapi-", suffix=".json")
+    try:
+        with os.fdopen(descriptor, "w") as file:
+            file.write(models.env.model_dump_json())
+        os.environ[WORKER_ENV] = filepath
+        uvicorn.run(**kwargs)
+    finally:
+        os.environ.pop(WORKER_ENV, None)
+        os.remove(filepath)
+
+
+def create_app() -> FastAPI:
+    """Application factory for uvicorn, which completes the setup in each worker process.
+
+    See Also:
+        With more than one worker, uvicorn spawns new processes where the session, database connections and
+        rate limiters have to be instantiated again, from the configuration file shared by the parent process.
+
+    Returns:
+        FastAPI:
+        Returns the ``VaultAPI`` application object.
+    """
+    if not isinstance(models.env, models.EnvConfig):
+        with open(os.environ[WORKER_ENV]) as file:
+            __init__(**json.load(file))
+    VaultAPI.routes.extend(routes.get_all_routes())
+    # middleware added last is the outermost, so CORS preflight requests are answered before the gate
+    enable_gate()
+    enable_metrics()
+    enable_profiler()
+    enable_cors()
+    enable_rotation()
+    return VaultAPI
@@ -0,0 +1,340 @@
+"""Module that records request and per-stage metrics, and renders them in the Prometheus text format.
+
+Metrics are held in memory by each uvicorn worker, so with multiple workers each scrape reflects the worker that
+served it.
+"""
+
+import bisect
+import contextlib
+import contextvars
+import functools
+import threading
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple, TypeVar
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from . import models
+
+T = TypeVar("T")
+
+# Upper bounds (in seconds) of the latency histogram buckets
+BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+def _labels(names: Iterable[str], values: Iterable[str]) -> str:
+    """Formats the label names and values for a sample."""
+    return ",".join(
+        f'{name}="{value}"' for name, value in zip(names, values) if value is not None
+    )
+
+
+class Counter:
+    """Counter with labels.
+
+    >>> Counter
+
+    """
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...]):
+        """Instantiates the counter.
+
+        Args:
+            name: Name of the metric.
+            documentation: Help text for the metric.
+            labels: Names of the labels.
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.lock = threading.Lock()
+        self.values: Dict[Tuple[str, ...], int] = {}
+
+    def inc(self, *labels: str) -> None:
+        """Increments the counter for the label values."""
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + 1
+
+    def render(self) -> List[str]:
+        """Renders the counter as Prometheus text lines."""
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} counter",
+        ]
+        with self.lock:
+            for labels, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{{{_labels(self.labels, labels)}}} {value}")
+        return lines
+
+
+class Histogram:
+    """Histogram with labels and fixed buckets.
+
+    >>> Histogram
+
+    """
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...]):
+        """Instantiates the histogram.
+
+        Args:
+            name: Name of the metric.
+            documentation: Help text for the metric.
+            labels: Names of the labels.
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.lock = threading.Lock()
+        # bucket counts (non-cumulative, with a trailing +Inf bucket), sum and count for each label set
+        self.values: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        """Records an observation for the label values."""
+        with self.lock:
+            if (entry := self.values.get(labels)) is None:
+                entry = self.values[labels] = ([0] * (len(BUCKETS) + 1), [0.0, 0])
+            entry[0][bisect.bisect_left(BUCKETS, value)] += 1
+            entry[1][0] += value
+            entry[1][1] += 1
+
+    def render(self) -> List[str]:
+        """Renders the histogram as Prometheus text lines."""
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} histogram",
+        ]
+        with self.lock:
+            for labels, (counts, (total, count)) in sorted(self.values.items()):
+                label_text = _labels(self.labels, labels)
+                prefix = f"{label_text}," if label_text else ""
+                cumulative = 0
+                for bound, bucket in zip((*BUCKETS, "+Inf"), counts):
+                    cumulative += bucket
+                    lines.append(
+                        f'{self.name}_bucket{{{prefix}le="{bound}"}} {cumulative}'
+                    )
+                lines.append(f"{self.name}_sum{{{label_text}}} {total}")
+                lines.append(f"{self.name}_count{{{label_text}}} {int(count)}")
+        return lines
+
+
+REQUESTS = Counter(
+    "vaultapi_requests_total",
+    "Total number of HTTP requests.",
+    ("path", "method", "status"),
+)
+LATENCY = Histogram(
+    "vaultapi_request_duration_seconds",
+    "Time taken to serve HTTP requests.",
+    ("path",),
+)
+STAGES = Histogram(
+    "vaultapi_stage_duration_seconds",
+    "Time spent in each stage of serving a request.",
+    ("stage",),
+)
+# Time spent in each stage by the current request, only set when the Server-Timing header is enabled
+TIMINGS: contextvars.ContextVar[Dict[str, float] | None] = contextvars.ContextVar(
+    "TIMINGS", default=None
+)
+
+
+@contextlib.contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Times the enclosed block as a stage of the request.
+
+    Args:
+        name: Name of the stage.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGES.observe(elapsed, name)
+        if (timings := TIMINGS.get()) is not None:
+            timings[name] = timings.get(name, 0.0) + elapsed
+
+
+def timed(name: str) -> Callable[[Callable[..., T]], Callable[..., T]]:
+    """Decorator to time each call to a function as a stage of the request.
+
+    Args:
+        name: Name of the stage.
+    """
+
+    def decorator(func: Callable[..., T]) -> Callable[..., T]:
+        """Wraps the function."""
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs) -> T:
+            """Times the function call."""
+            with stage(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def _gauge(name: str, documentation: str, samples: Dict[str, float]) -> List[str]:
+    """Renders a gauge with pre-formatted labels as Prometheus text lines."""
+    lines = [f"# HELP {name} {documentation}", f"# TYPE {name} gauge"]
+    for labels, value in samples.items():
+        lines.append(f"{name}{{{labels}}} {value}" if labels else f"{name} {value}")
+    return lines
+
+
+def render() -> str:
+    """Renders all the metrics and gauges in the Prometheus text format.
+
+    Returns:
+        str:
+        Returns the metrics as text.
+    """
+    lines = [*REQUESTS.render(), *LATENCY.render(), *STAGES.render()]
+    cache_info = models.cache.info()
+    for key in ("size", "max_size", "hits", "misses", "evictions"):
+        lines.extend(
+            _gauge(
+                f"vaultapi_cache_{key}", f"Secret cache {key}.", {"": cache_info[key]}
+            )
+        )
+    lines.extend(
+        _gauge(
+            "vaultapi_rate_limit_identifiers",
+            "Number of identifiers tracked by each in-memory rate limiter.",
+            {
+                f'limit="{limiter.max_requests}/{limiter.seconds}"': len(
+                    limiter.buckets
+                )
+                for limiter in models.session.rate_limiters
+                if not limiter.blocking
+            },
+        )
+    )
+    if isinstance(models.database, models.Database):
+        lines.extend(
+            _gauge(
+                "vaultapi_database_reader_connections",
+                "Number of read-only connections in the pool.",
+                {"": len(models.database.readers)},
+            )
+        )
+    return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware that records the count, status and latency of each request.
+
+    >>> MetricsMiddleware
+
+    """
+
+    def __init__(self, app: ASGIApp, paths: Iterable[str]):
+        """Instantiates the middleware with the necessary args.
+
+        Args:
+            app: ASGI application to be wrapped.
+            paths: Known paths, any other path is recorded as ``other`` to keep the label cardinality bounded.
+        """
+        self.app = app
+        self.paths = frozenset(paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Times the request and records the response status."""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        path = scope["path"] if scope["path"] in self.paths else "other"
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            """Captures the status code from the response start message."""
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            LATENCY.observe(time.perf_counter() - start, path)
+            REQUESTS.inc(path, scope["method"], str(status))
+
+
+def server_timing(timings: Dict[str, float], total: float) -> str:
+    """Formats the stage timings as the value of a ``Server-Timing`` header.
+
+    Args:
+        timings: Seconds spent in each stage.
+        total: Seconds spent on the request until the response started.
+
+    Returns:
+        str:
+        Returns the header value, with durations in milliseconds.
+    """
+    metrics = [f"{name};dur={elapsed * 1000:.3f}" for name, elapsed in timings.items()]
+    metrics.append(f"total;dur={total * 1000:.3f}")
+    return ", ".join(metrics)
+
+
+class ServerTimingMiddleware:
+    """Pure ASGI middleware that adds the time spent in each stage of the request as a ``Server-Timing`` header.
+
+    >>> ServerTimingMiddleware
+
+    See Also:
+        Only the stages that complete before the response starts are included, so the time taken to stream the
+        body of a response is not reflected in the header.
+    """
+
+    def __init__(self, app: ASGIApp):
+        """Instantiates the middleware with the necessary args.
+
+        Args:
+            app: ASGI application to be wrapped.
+        """
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Collects the stage timings of the request, and adds them to the response headers."""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        timings: Dict[str, float] = {}
+        start = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            """Adds the header to the response start message."""
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "Server-Timing",
+                    server_timing(timings, time.perf_counter() - start),
+                )
+            await send(message)
+
+        token = TIMINGS.set(timings)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            TIMINGS.reset(token)
@@ -0,0 +1,83 @@
+"""Module for the raw ASGI middleware that authorizes requests before they reach FastAPI.
+
+The IP allowlist, rate limits and the bearer token are checked from the connection scope and headers alone,
+so a rejected request never gets routed, never has its body read and never goes through Pydantic validation.
+"""
+
+from typing import Iterable, List
+
+from fastapi import HTTPException, Request
+from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from . import auth, executor, metrics, rate_limit
+
+
+class PreAuthGate:
+    """Pure ASGI middleware that rejects unauthorized requests early.
+
+    >>> PreAuthGate
+
+    See Also:
+        Checks are ordered from the cheapest to the most expensive, and the rate limits are applied before the
+        API key is compared, so failed attempts count against the limit.
+
+        1. Client host against the allowlist (403)
+        2. Rate limits for the client and path (429)
+        3. Bearer token against the API key, compared in constant time (403/401)
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        limiters: List[rate_limit.RateLimiter],
+        public_paths: Iterable[str],
+    ):
+        """Instantiates the middleware with the necessary args.
+
+        Args:
+            app: ASGI application to be wrapped.
+            limiters: Rate limiters to apply to every protected request.
+            public_paths: Paths that are served without authorization.
+        """
+        self.app = app
+        self.limiters = limiters
+        self.public_paths = frozenset(public_paths)
+
+    async def authorize(self, request: Request) -> None:
+        """Runs the allowlist, rate limit and bearer token checks.
+
+        Args:
+            request: Request object built from the connection scope, without the body.
+
+        Raises:
+            HTTPException:
+            Raises the HTTPException (or APIResponse) for the first check that fails.
+        """
+        with metrics.stage("allowlist"):
+            auth.validate_host(request)
+        with metrics.stage("rate_limit"):
+            for limiter in self.limiters:
+                if limiter.blocking:
+                    await executor.run(limiter.init, request)
+                else:
+                    limiter.init(request)
+        with metrics.stage("auth"):
+            auth.validate_apikey(request, await auth.SECURITY(request))
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Authorizes HTTP requests to protected paths, before passing them on to the application."""
+        if scope["type"] != "http" or scope["path"] in self.public_paths:
+            await self.app(scope, receive, send)
+            return
+        try:
+            await self.authorize(Request(scope))
+        except HTTPException as error:
+            response = JSONResponse(
+                {"detail": error.detail},
+                status_code=error.status_code,
+                headers=error.headers,
+            )
+            await response(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
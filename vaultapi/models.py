@@ -1,21 +1,30 @@
+import contextlib
 import pathlib
 import re
 import socket
 import sqlite3
-from typing import Any, Dict, List, Set
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List
 
-from cryptography.fernet import Fernet
+from cryptography.fernet import Fernet, MultiFernet
 from pydantic import (
     BaseModel,
+    DirectoryPath,
     Field,
     FilePath,
     HttpUrl,
     NewPath,
+    NonNegativeInt,
+    PositiveFloat,
     PositiveInt,
     field_validator,
 )
 from pydantic_settings import BaseSettings
 
+from .allowlist import AllowList, parse
+from .cache import SecretCache
+
 
 def complexity_checker(secret: str) -> None:
     """Verifies the strength of a secret.
@@ -57,25 +66,116 @@ def complexity_checker(secret: str) -> None:
 
 
 class Database:
-    """Creates a connection and instantiates the cursor.
+    """Creates a connection pool with a single serialized writer and a read-only connection per thread.
 
     >>> Database
 
     Args:
         filepath: Name of the database file.
         timeout: Timeout for the connection to database.
+        mmap_size: Maximum number of bytes of the database file to memory-map for reads.
+        cache_size: Page cache size for each connection, negative values are in KiB.
+
+    See Also:
+        The database is switched to WAL journal mode, so readers never wait for the writer (or each other),
+        including readers and writers from other uvicorn workers.
     """
 
-    def __init__(self, filepath: FilePath | str, timeout: int = 10):
-        """Instantiates the class ``Database`` to create a connection and a cursor."""
+    def __init__(
+        self,
+        filepath: FilePath | str,
+        timeout: int = 10,
+        mmap_size: int = 0,
+        cache_size: int = -2000,
+    ):
+        """Instantiates the class ``Database`` to create the writer connection and the reader pool."""
         if not filepath.endswith(".db"):
             filepath = filepath + ".db"
-        self.connection = sqlite3.connect(
-            database=filepath, check_same_thread=False, timeout=timeout
+        self.filepath = filepath
+        self.timeout = timeout
+        self.pragmas = dict(
+            synchronous="NORMAL", mmap_size=int(mmap_size), cache_size=int(cache_size)
         )
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.readers: List[sqlite3.Connection] = []
+        self.connection = self.connect()
+        self.connection.execute("PRAGMA journal_mode=WAL")
+
+    def connect(self, readonly: bool = False) -> sqlite3.Connection:
+        """Opens a new connection in autocommit mode with the configured pragmas.
+
+        Args:
+            readonly: Boolean flag to open the connection in read-only mode.
+
+        Returns:
+            sqlite3.Connection:
+            Returns the connection object.
+        """
+        if readonly:
+            database = f"{pathlib.Path(self.filepath).absolute().as_uri()}?mode=ro"
+        else:
+            database = self.filepath
+        connection = sqlite3.connect(
+            database=database,
+            uri=readonly,
+            check_same_thread=False,
+            timeout=self.timeout,
+            isolation_level=None,
+        )
+        for pragma, value in self.pragmas.items():
+            connection.execute(f"PRAGMA {pragma}={value}")
+        return connection
+
+    @property
+    def reader(self) -> sqlite3.Connection:
+        """Read-only connection that belongs to the current thread.
+
+        Returns:
+            sqlite3.Connection:
+            Returns the connection object.
+        """
+        if (connection := getattr(self.local, "connection", None)) is None:
+            connection = self.local.connection = self.connect(readonly=True)
+            self.readers.append(connection)
+        return connection
+
+    @contextlib.contextmanager
+    def writer(self) -> Iterator[sqlite3.Connection]:
+        """Serializes access to the writer connection and wraps the block in a single transaction.
+
+        Yields:
+            sqlite3.Connection:
+            Yields the writer connection, which is committed on exit or rolled back on error.
+        """
+        with self.lock:
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield self.connection
+            except BaseException:
+                self.connection.execute("ROLLBACK")
+                raise
+            self.connection.execute("COMMIT")
+
+    @contextlib.contextmanager
+    def snapshot(self) -> Iterator[sqlite3.Connection]:
+        """Wraps the block in a read transaction, so all the queries in it see the same state of the database.
+
+        Yields:
+            sqlite3.Connection:
+            Yields the read-only connection of the current thread.
+        """
+        connection = self.reader
+        connection.execute("BEGIN")
+        try:
+            yield connection
+        finally:
+            connection.execute("COMMIT")
 
 
 database: Database = Database  # noqa: PyTypeChecker
+state: Database | None = None
+cache: SecretCache = SecretCache(max_size=0, ttl=0)
 
 
 class RateLimit(BaseModel):
@@ -96,10 +196,14 @@ class Session(BaseModel):
 
     """
 
-    fernet: Fernet | None = None
+    fernet: Fernet | MultiFernet | None = None
+    executor: ThreadPoolExecutor | None = None
+    crypto_executor: ThreadPoolExecutor | None = None
     info: Dict[str, str] = {}
     rps: Dict[str, int] = {}
-    allowed_origins: Set[str] = set()
+    allowlist: AllowList = AllowList()
+    metrics_allowlist: AllowList | None = None
+    rate_limiters: List[Any] = []
 
     class Config:
         """Config to allow arbitrary types."""
@@ -116,15 +220,37 @@ class EnvConfig(BaseSettings):
 
     apikey: str
     secret: str
+    previous_secrets: List[str] = []
+    rotation_rate: NonNegativeInt = 1000
+    rotation_batch_size: PositiveInt = 500
     transit_key_length: PositiveInt = 32
     transit_time_bucket: PositiveInt = 60
+    transit_compression_threshold: NonNegativeInt = 1024
     database: FilePath | NewPath | str = Field("secrets.db", pattern=".*.db$")
-    host: str = socket.gethostbyname("localhost") or "0.0.0.0"
+    # resolved when the config is loaded, rather than when the module is imported
+    host: str = Field(
+        default_factory=lambda: socket.gethostbyname("localhost") or "0.0.0.0"
+    )
     port: PositiveInt = 9010
     workers: PositiveInt = 1
+    database_mmap_size: NonNegativeInt = 134_217_728
+    database_cache_size: int = -8_000
+    executor_workers: PositiveInt = 8
+    crypto_workers: NonNegativeInt = 0
+    crypto_parallel_threshold: PositiveInt = 1000
+    stream_batch_size: PositiveInt = 500
+    secret_cache_size: NonNegativeInt = 1024
+    secret_cache_ttl: NonNegativeInt = 60
     log_config: FilePath | Dict[str, Any] | None = None
     allowed_origins: HttpUrl | List[HttpUrl] = []
     allowed_ip_range: List[str] = []
+    metrics_allowlist: List[str] = []
+    changelog_retention: NonNegativeInt = 604_800
+    watch_poll_interval: PositiveFloat = 1.0
+    watch_heartbeat: PositiveFloat = 15.0
+    server_timing: bool = False
+    profile_sample_rate: NonNegativeInt = 0
+    profile_directory: DirectoryPath | NewPath | str = "profiles"
     # This is a base rate limit configuration
     rate_limit: RateLimit | List[RateLimit] = [
         # Burst limit: Prevents excessive load on the server
@@ -148,21 +274,21 @@ class EnvConfig(BaseSettings):
             return value
         return [value]
 
-    @field_validator("allowed_ip_range", mode="after", check_fields=True)
+    @field_validator(
+        "allowed_ip_range", "metrics_allowlist", mode="after", check_fields=True
+    )
     def validate_allowed_ip_range(
         cls, value: List[str]  # noqa: PyMethodParameters
     ) -> List[str]:
-        """Validate allowed IP range to whitelist."""
+        """Validate allowed IP ranges, CIDR blocks or addresses to whitelist."""
         for ip_range in value:
             try:
-                assert (
-                    len(ip_range.split(".")) > 1
-                ), f"Expected a valid IP address, received {ip_range}"
-                assert (
-                    len(ip_range.split(".")[-1].split("-")) == 2
-                ), f"Expected a valid IP range, received {ip_range}"
-            except AssertionError as error:
-                exc = f"{error}\n\tInput should be a list of IP range (eg: ['192.168.1.10-19', '10.120.1.5-35'])"
+                parse(ip_range)
+            except ValueError as error:
+                exc = (
+                    f"{error}\n\tInput should be a list of IP ranges, CIDR blocks or addresses "
+                    "(eg: ['192.168.1.10-19', '10.120.0.0/16', 'fd00::/64'])"
+                )
                 raise ValueError(exc)
         return value
 
@@ -185,6 +311,18 @@ class EnvConfig(BaseSettings):
             raise ValueError(exc)
         return value
 
+    @field_validator("previous_secrets", mode="after")
+    def validate_previous_secrets(  # noqa: PyMethodParameters
+        cls, value: List[str]
+    ) -> List[str]:
+        """Validate previous API secrets to Fernet compatible."""
+        for secret in value:
+            try:
+                Fernet(secret)
+            except ValueError as error:
+                raise ValueError(f"{error}\n\tInput should be a list of Fernet keys")
+        return value
+
     @classmethod
     def from_env_file(cls, env_file: pathlib.Path) -> "EnvConfig":
         """Create Settings instance from environment file.
@@ -0,0 +1,88 @@
+"""Module that profiles a sample of the requests, to diagnose slow requests without attaching to the process.
+
+Every Nth request is run under ``cProfile``, and the stats are dumped to the profile directory as a ``.prof`` file,
+which can be inspected with ``python -m pstats`` or visualized with tools like ``snakeviz``.
+"""
+
+import cProfile
+import itertools
+import logging
+import os
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from . import executor
+
+LOGGER = logging.getLogger("uvicorn.default")
+
+
+class ProfilerMiddleware:
+    """Pure ASGI middleware that profiles one in every ``sample_rate`` requests.
+
+    >>> ProfilerMiddleware
+
+    See Also:
+        The profiler traces the event loop thread, so any other request that is served concurrently on the same
+        worker also shows up in the stats, while the work offloaded to the executor threads does not.
+        Only one request is profiled at a time, and the sampled requests are skipped while another one is running.
+    """
+
+    def __init__(self, app: ASGIApp, sample_rate: int, directory: str):
+        """Instantiates the middleware with the necessary args.
+
+        Args:
+            app: ASGI application to be wrapped.
+            sample_rate: Profile one in every ``sample_rate`` requests.
+            directory: Directory where the profile stats are stored.
+        """
+        self.app = app
+        self.sample_rate = sample_rate
+        self.directory = directory
+        self.counter = itertools.count(1)
+        self.active = False
+
+    def filepath(self, scope: Scope, status: int) -> str:
+        """Constructs the filepath for the profile stats of a request.
+
+        Args:
+            scope: Connection scope of the request.
+            status: Status code of the response.
+
+        Returns:
+            str:
+            Returns the filepath, with the time, method, path and status of the request.
+        """
+        path = scope["path"].strip("/").replace("/", "_") or "root"
+        filename = f"{time.time_ns()}_{scope['method']}_{path}_{status}.prof"
+        return os.path.join(self.directory, filename)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Profiles the sampled requests, and passes on the rest to the application."""
+        if (
+            scope["type"] != "http"
+            or next(self.counter) % self.sample_rate
+            or self.active
+        ):
+            await self.app(scope, receive, send)
+            return
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            """Captures the status code from the response start message."""
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        self.active = True
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profile.disable()
+            self.active = False
+            filepath = self.filepath(scope, status)
+            await executor.run(profile.dump_stats, filepath)
+            LOGGER.debug("Stored the request profile in %s", filepath)
@@ -3,6 +3,7 @@ import math
 import time
 from http import HTTPStatus
 from threading import Lock
+from typing import Tuple
 
 from fastapi import HTTPException, Request
 
@@ -17,12 +18,19 @@ def _get_identifier(request: Request) -> str:
 
 
 class RateLimiter:
-    """Rate limiter for incoming requests.
+    """Token bucket rate limiter for incoming requests.
 
     >>> RateLimiter
 
+    See Also:
+        Each identifier holds a bucket of ``max_requests`` tokens, that refills continuously over ``seconds``.
+        Buckets are kept in least-recently-used order, so the ones that have been idle long enough to be full
+        again are evicted from the front, keeping both time and memory constant per identifier.
     """
 
+    # Boolean flag to indicate whether the check performs I/O, and should not run on the event loop
+    blocking = False
+
     def __init__(self, rps: models.RateLimit):
         # noinspection PyUnresolvedReferences
         """Instantiates the object with the necessary args.
@@ -32,12 +40,54 @@ class RateLimiter:
 
         Attributes:
             max_requests: Maximum requests to allow in a given time frame.
-            seconds: Number of seconds after which the cache is set to expire.
+            seconds: Number of seconds to refill the bucket completely.
+            rate: Number of tokens added to the bucket per second.
+            buckets: Remaining tokens and the last update time for each identifier.
         """
         self.max_requests = rps.max_requests
         self.seconds = rps.seconds
-        self.locks = collections.defaultdict(Lock)  # For thread-safe access
-        self.requests = collections.defaultdict(list)
+        self.rate = rps.max_requests / rps.seconds
+        self.lock = Lock()  # For thread-safe access
+        self.buckets: collections.OrderedDict[str, Tuple[float, float]] = (
+            collections.OrderedDict()
+        )
+
+    def evict(self, current_time: float) -> None:
+        """Removes the buckets that have been idle long enough to be full.
+
+        Args:
+            current_time: Current monotonic time.
+        """
+        while self.buckets:
+            identifier, (_, updated) = next(iter(self.buckets.items()))
+            if current_time - updated < self.seconds:
+                break
+            del self.buckets[identifier]
+
+    def consume(self, identifier: str) -> float | None:
+        """Takes a token from the bucket of the given identifier.
+
+        Args:
+            identifier: Unique identifier for the client and the path.
+
+        Returns:
+            float:
+            Returns the number of seconds until a token is available, or None if the request is allowed.
+        """
+        current_time = time.monotonic()
+        with self.lock:
+            self.evict(current_time)
+            if bucket := self.buckets.pop(identifier, None):
+                tokens, updated = bucket
+                tokens = min(
+                    self.max_requests, tokens + (current_time - updated) * self.rate
+                )
+            else:
+                tokens = self.max_requests
+            if tokens < 1:
+                self.buckets[identifier] = (tokens, current_time)
+                return (1 - tokens) / self.rate
+            self.buckets[identifier] = (tokens - 1, current_time)
 
     def init(self, request: Request) -> None:
         """Checks if the number of calls exceeds the rate limit for the given identifier.
@@ -48,21 +98,112 @@ class RateLimiter:
         Raises:
             429: Too many requests.
         """
-        identifier = _get_identifier(request)
-        current_time = time.time()
+        if (retry_after := self.consume(_get_identifier(request))) is not None:
+            raise HTTPException(
+                status_code=HTTPStatus.TOO_MANY_REQUESTS.value,
+                detail=HTTPStatus.TOO_MANY_REQUESTS.phrase,
+                headers={"Retry-After": str(math.ceil(retry_after))},
+            )
 
-        with self.locks[identifier]:
-            # Clean up expired timestamps
-            self.requests[identifier] = [
-                timestamp
-                for timestamp in self.requests[identifier]
-                if current_time - timestamp < self.seconds
-            ]
-
-            if len(self.requests[identifier]) >= self.max_requests:
-                raise HTTPException(
-                    status_code=HTTPStatus.TOO_MANY_REQUESTS.value,
-                    detail=HTTPStatus.TOO_MANY_REQUESTS.phrase,
-                    headers={"Retry-After": str(math.ceil(self.seconds))},
-                )
-            self.requests[identifier].append(current_time)
+
+class SharedRateLimiter(RateLimiter):
+    """Token bucket rate limiter, with the buckets shared by all the uvicorn workers.
+
+    >>> SharedRateLimiter
+
+    See Also:
+        Buckets are stored in a SQLite database and each token is taken with a single atomic upsert,
+        so the configured limit holds across the whole server, regardless of the number of workers.
+    """
+
+    blocking = True
+
+    def __init__(self, rps: models.RateLimit, database: models.Database):
+        # noinspection PyUnresolvedReferences
+        """Instantiates the object with the necessary args.
+
+        Args:
+            rps: RateLimit object with ``max_requests`` and ``seconds``.
+            database: Database object where the buckets are stored.
+
+        Attributes:
+            scope: Prefix to separate the buckets of each rate limit in the shared table.
+            evicted: Time when the idle buckets were last evicted.
+        """
+        super().__init__(rps)
+        self.database = database
+        self.scope = f"{rps.max_requests}/{rps.seconds}"
+        self.evicted = 0.0
+        with self.database.writer() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limit "
+                "(identifier TEXT PRIMARY KEY, tokens REAL, updated REAL, seconds INTEGER)"
+            )
+
+    def evict(self, current_time: float) -> None:
+        """Removes the buckets that have been idle long enough to be full, at most once per window.
+
+        Args:
+            current_time: Current epoch time.
+        """
+        if current_time - self.evicted < self.seconds:
+            return
+        self.evicted = current_time
+        self.database.connection.execute(
+            "DELETE FROM rate_limit WHERE seconds=? AND updated<?",
+            (self.seconds, current_time - self.seconds),
+        )
+
+    def consume(self, identifier: str) -> float | None:
+        """Takes a token from the shared bucket of the given identifier.
+
+        Args:
+            identifier: Unique identifier for the client and the path.
+
+        Returns:
+            float:
+            Returns the number of seconds until a token is available, or None if the request is allowed.
+        """
+        # wall clock time, since monotonic time is not comparable across processes
+        current_time = time.time()
+        params = dict(
+            identifier=f"{self.scope}:{identifier}",
+            capacity=self.max_requests,
+            rate=self.rate,
+            now=current_time,
+            seconds=self.seconds,
+        )
+        with self.database.lock:
+            self.evict(current_time)
+            # the upsert changes a row only when a token is taken, so the row count tells whether it was allowed,
+            # without 'RETURNING' which needs SQLite 3.35
+            if self.database.connection.execute(
+                "INSERT INTO rate_limit (identifier, tokens, updated, seconds) "
+                "VALUES (:identifier, :capacity - 1, :now, :seconds) "
+                "ON CONFLICT(identifier) DO UPDATE SET "
+                "tokens=MIN(:capacity, tokens + (:now - updated) * :rate) - 1, updated=:now "
+                "WHERE MIN(:capacity, tokens + (:now - updated) * :rate) >= 1",
+                params,
+            ).rowcount:
+                return
+            tokens, updated = self.database.connection.execute(
+                "SELECT tokens, updated FROM rate_limit WHERE identifier=:identifier",
+                params,
+            ).fetchone()
+        tokens = min(self.max_requests, tokens + (current_time - updated) * self.rate)
+        return max(1 - tokens, 0) / self.rate
+
+
+def get_rate_limiter(rps: models.RateLimit) -> RateLimiter:
+    """Get the rate limiter for the configured number of workers.
+
+    Args:
+        rps: RateLimit object with ``max_requests`` and ``seconds``.
+
+    Returns:
+        RateLimiter:
+        Returns a ``SharedRateLimiter`` when the state database is available, else an in-memory ``RateLimiter``.
+    """
+    if models.state:
+        return SharedRateLimiter(rps, models.state)
+    return RateLimiter(rps)
@@ -0,0 +1,74 @@
+"""Module that builds the ``{"detail": ...}`` responses directly, instead of raising them as exceptions.
+
+The bodies are byte-for-byte identical to what the ``HTTPException`` handler renders with ``JSONResponse``, so clients
+see the same wire format. Constant bodies are encoded once, and transit encrypted bodies are assembled around the
+base64 ciphertext, which never needs to be escaped.
+"""
+
+import json
+from http import HTTPStatus
+from typing import Any, Dict
+
+from fastapi.responses import Response
+
+MEDIA_TYPE = "application/json"
+OK = json.dumps(
+    {"detail": HTTPStatus.OK.phrase}, ensure_ascii=False, separators=(",", ":")
+).encode()
+NOT_FOUND = json.dumps(
+    {"detail": HTTPStatus.NOT_FOUND.phrase}, ensure_ascii=False, separators=(",", ":")
+).encode()
+
+
+def detail(
+    value: Any, status_code: int = HTTPStatus.OK.real, headers: Dict[str, str] = None
+) -> Response:
+    """Builds a response with the value as the ``detail``, encoded the same way as ``JSONResponse``.
+
+    Args:
+        value: JSON serializable value.
+        status_code: Status code of the response.
+        headers: Headers to be included in the response.
+
+    Returns:
+        Response:
+        Returns the response object.
+    """
+    content = json.dumps(
+        {"detail": value},
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+    return Response(content, status_code, headers, MEDIA_TYPE)
+
+
+def ok(headers: Dict[str, str] = None) -> Response:
+    """Builds the ``{"detail":"OK"}`` response from the pre-encoded body."""
+    return Response(OK, HTTPStatus.OK.real, headers, MEDIA_TYPE)
+
+
+def not_found(headers: Dict[str, str] = None) -> Response:
+    """Builds the ``{"detail":"Not Found"}`` response from the pre-encoded body."""
+    return Response(NOT_FOUND, HTTPStatus.NOT_FOUND.real, headers, MEDIA_TYPE)
+
+
+def transit(
+    ciphertext: str,
+    status_code: int = HTTPStatus.OK.real,
+    headers: Dict[str, str] = None,
+) -> Response:
+    """Builds the response for a base64 encoded ciphertext, without running it through the JSON encoder.
+
+    Args:
+        ciphertext: Base64 encoded ciphertext, which only has characters that are safe in a JSON string.
+        status_code: Status code of the response.
+        headers: Headers to be included in the response.
+
+    Returns:
+        Response:
+        Returns the response object.
+    """
+    content = b'{"detail":"' + ciphertext.encode() + b'"}'
+    return Response(content, status_code, headers, MEDIA_TYPE)
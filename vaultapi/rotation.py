@@ -0,0 +1,162 @@
+"""Module that re-encrypts the stored secrets with the primary key, after the ``secret`` has been rotated.
+
+Reads accept the ``secret`` and every key in ``previous_secrets`` through ``MultiFernet``, so the secrets are served
+while a background job re-encrypts them in batches, within ``rotation_rate`` rows per second. Each batch is a short
+write transaction, and the progress of each table is checkpointed with it, so the job resumes after a restart.
+A lease in the database allows only one worker to run the job at a time, and another takes over if it expires.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import time
+from typing import Any, Dict
+
+from cryptography.fernet import Fernet
+
+from . import crypto, database, executor, models
+
+LOGGER = logging.getLogger("uvicorn.default")
+# Number of seconds after which the lease of a worker expires, unless it is renewed by the next batch
+LEASE_TTL = 30
+_task: asyncio.Task | None = None
+
+
+def key_id(secret: str) -> int:
+    """Derives an identifier for the key, that fits in an SQLite integer without revealing the key."""
+    return int.from_bytes(hashlib.sha256(secret.encode()).digest()[:7], "big")
+
+
+def enabled() -> bool:
+    """Returns a boolean flag to indicate whether there are previous keys to rotate from."""
+    return bool(models.env.previous_secrets and models.env.rotation_rate)
+
+
+async def rotate_table(table_name: str, primary: Fernet, owner: int) -> bool:
+    """Re-encrypts the rows of a table in batches, starting after the last checkpoint.
+
+    Args:
+        table_name: Name of the table to be rotated.
+        primary: Fernet object for the primary key.
+        owner: Identifier of the worker, that holds the lease.
+
+    Returns:
+        bool:
+        Returns a boolean flag to indicate whether the lease is still held.
+    """
+    checkpoint = (await executor.run(database.get_rotation)).get(table_name)
+    if checkpoint and checkpoint[2]:
+        return True
+    last_rowid = checkpoint[0] if checkpoint else 0
+    batch_size = min(models.env.rotation_batch_size, models.env.rotation_rate)
+    while True:
+        start = time.monotonic()
+        try:
+            rows = await executor.run(
+                database.get_rotation_batch, table_name, last_rowid, batch_size
+            )
+        except sqlite3.OperationalError as error:
+            # the table was dropped since the rotation started
+            LOGGER.warning("Skipping the rotation of '%s': %s", table_name, error)
+            return True
+        rotated = await executor.run(
+            crypto.rotate, [value for _, value in rows], primary
+        )
+        updates = [(new, rowid, old) for (rowid, old), new in zip(rows, rotated) if new]
+        if rows:
+            last_rowid = rows[-1][0]
+        completed = len(rows) < batch_size
+        if not await executor.run(
+            database.put_rotation_batch,
+            table_name,
+            updates,
+            last_rowid,
+            completed,
+            owner,
+            LEASE_TTL,
+        ):
+            return False
+        if completed:
+            LOGGER.info("Secrets in the table '%s' have been rotated", table_name)
+            return True
+        await asyncio.sleep(
+            max(0.0, len(rows) / models.env.rotation_rate - (time.monotonic() - start))
+        )
+
+
+async def run() -> None:
+    """Waits for the lease, and rotates every table until all of them are encrypted with the primary key."""
+    owner = os.getpid()
+    primary = Fernet(models.env.secret)
+    while True:
+        try:
+            acquired = await executor.run(
+                database.acquire_rotation_lease,
+                owner,
+                LEASE_TTL,
+                key_id(models.env.secret),
+            )
+        except sqlite3.OperationalError as error:
+            LOGGER.warning("Failed to acquire the rotation lease: %s", error)
+            acquired = False
+        if not acquired:
+            await asyncio.sleep(LEASE_TTL)
+            continue
+        try:
+            for table_name in await executor.run(database.get_tables):
+                if not await rotate_table(table_name, primary, owner):
+                    LOGGER.warning("Rotation lease was taken over by another worker")
+                    break
+            else:
+                return
+        except Exception as error:
+            LOGGER.error("Failed to rotate the secrets: %s", error)
+        finally:
+            await executor.run(database.release_rotation_lease, owner)
+        await asyncio.sleep(LEASE_TTL)
+
+
+async def start() -> None:
+    """Starts the rotation job in the background, if there are previous keys to rotate from."""
+    global _task
+    if enabled() and _task is None:
+        LOGGER.info(
+            "Rotating the secrets to the primary key, at %d rows per second",
+            models.env.rotation_rate,
+        )
+        _task = asyncio.create_task(run())
+
+
+async def stop() -> None:
+    """Cancels the rotation job, the next worker to acquire the lease resumes from the last checkpoint."""
+    global _task
+    if _task is not None:
+        _task.cancel()
+        _task = None
+
+
+def status() -> Dict[str, Any]:
+    """Summarizes the rotation progress of each table.
+
+    Returns:
+        Dict[str, Any]:
+        Returns the progress of each table, whether a worker holds the lease and whether every table is rotated.
+    """
+    progress = database.get_rotation()
+    tables = {}
+    for table_name in database.get_tables():
+        last_rowid, rotated, completed = progress.get(table_name, (0, 0, False))
+        tables[table_name] = {
+            "rotated": rotated,
+            "last_rowid": last_rowid,
+            "completed": completed,
+        }
+    return {
+        "enabled": enabled(),
+        # the job may be running in another worker, so the lease is checked instead of the local task
+        "running": database.get_rotation_lease_expiry() > time.time(),
+        "completed": all(table["completed"] for table in tables.values()),
+        "tables": tables,
+    }
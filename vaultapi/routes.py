@@ -1,17 +1,39 @@
+import hashlib
 import logging
 import sqlite3
 from http import HTTPStatus
-from typing import Dict, List
+from typing import Any, Dict, Iterator, List, Tuple
 
 from fastapi import Depends, Request
-from fastapi.responses import RedirectResponse
+from fastapi.responses import (
+    PlainTextResponse,
+    RedirectResponse,
+    Response,
+    StreamingResponse,
+)
 from fastapi.routing import APIRoute
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-
-from . import auth, database, exceptions, models, payload, rate_limit, transit
+from pydantic import NonNegativeInt
+
+from . import (
+    codec,
+    crypto,
+    database,
+    exceptions,
+    executor,
+    metrics,
+    models,
+    payload,
+    responses,
+    rotation,
+    transit,
+    watch,
+)
 
 LOGGER = logging.getLogger("uvicorn.default")
 security = HTTPBearer()
+# Request headers that select the transit format, so caches must key the responses and the 304s on them
+VARY = "Accept, X-Transit-Format, X-Transit-Encoding"
 
 
 async def retrieve_secret(key: str, table_name: str) -> str | None:
@@ -26,7 +48,7 @@ async def retrieve_secret(key: str, table_name: str) -> str | None:
         Returns the secret value.
     """
     try:
-        return database.get_secret(key=key, table_name=table_name)
+        return await executor.run(database.get_secret, key=key, table_name=table_name)
     except sqlite3.OperationalError as error:
         LOGGER.error(error)
         raise exceptions.APIResponse(
@@ -34,31 +56,337 @@ async def retrieve_secret(key: str, table_name: str) -> str | None:
         )
 
 
-async def retrieve_secrets(table_name: str, keys: List[str] = None) -> Dict[str, str]:
-    """Retrieve multiple secrets from a table or retrieve the table as a whole.
+def decrypt_secrets(
+    table_name: str, keys: List[str], version: int = None
+) -> Dict[str, str]:
+    """Retrieves and decrypts multiple secrets, serving from the cache where possible.
+
+    See Also:
+        This is a blocking call, that is meant to be run in the executor.
+
+        Cached secrets are only served for the current version of the table, so a write from any worker
+        makes the next read go to the database.
 
     Args:
-        table_name: Name of the table where the secret is stored.
+        table_name: Name of the table where the secrets are stored.
         keys: List of keys for which the values have to be retrieved.
+        version: Version of the table that the ETag was derived from, defaults to the current version.
 
     Returns:
         Dict[str, str]:
-        Returns the key-value pairs for secret key and it's value.
+        Returns the key-value pairs for secret key and it's decrypted value.
     """
-    if keys:
-        values = {}
+    values = {}
+    missing = []
+    if models.cache.enabled:
+        if version is None:
+            version = database.get_version(table_name)
         for key in keys:
-            if value := await retrieve_secret(key, table_name):
+            if (value := models.cache.get(table_name, key, version)) is not None:
                 values[key] = value
-        return values
+            else:
+                missing.append(key)
     else:
-        try:
-            return dict(database.get_table(table_name))
-        except sqlite3.OperationalError as error:
-            LOGGER.error(error)
+        missing = keys
+    if missing:
+        version, encrypted = database.get_versioned_secrets(missing, table_name)
+        for key, value in zip(encrypted, crypto.decrypt(list(encrypted.values()))):
+            models.cache.put(table_name, key, value, version)
+            values[key] = value
+    return {key: values[key] for key in keys if key in values}
+
+
+def decrypt_table(table_name: str) -> Dict[str, str]:
+    """Retrieves and decrypts all the secrets stored in a table.
+
+    See Also:
+        This is a blocking call, that is meant to be run in the executor.
+
+    Args:
+        table_name: Name of the table where the secrets are stored.
+
+    Returns:
+        Dict[str, str]:
+        Returns the key-value pairs for secret key and it's decrypted value.
+    """
+    table_content = database.get_table(table_name)
+    return dict(
+        zip(
+            (key for key, _ in table_content),
+            crypto.decrypt([value for _, value in table_content]),
+        )
+    )
+
+
+def stream_table(table_name: str) -> Iterator[Dict[str, str]]:
+    """Iterates over a table and decrypts the secrets in batches.
+
+    Args:
+        table_name: Name of the table where the secrets are stored.
+
+    Yields:
+        Dict[str, str]:
+        Yields the key-value pairs for each batch of secrets.
+    """
+    for rows in database.iter_table(table_name, models.env.stream_batch_size):
+        yield dict(
+            zip((key for key, _ in rows), crypto.decrypt([value for _, value in rows]))
+        )
+
+
+def decrypt_changes(table_name: str, since: int) -> Dict[str, Any]:
+    """Retrieves the changes to a table after a sequence number, coalesced to the latest change for each key.
+
+    See Also:
+        This is a blocking call, that is meant to be run in the executor.
+
+        The change log and the values are read from the database in a single read transaction, bypassing the
+        secret cache, so the values are always those as of the returned sequence number.
+
+    Args:
+        table_name: Name of the table where the secrets are stored.
+        since: Sequence number after which the changes are retrieved.
+
+    Raises:
+        APIResponse:
+        Raises the HTTPStatus object with 410, if the changes after the sequence number are no longer retained.
+
+    Returns:
+        Dict[str, Any]:
+        Returns the sequence number of the last change, whether the table was dropped (``reset``), the decrypted
+        key-value pairs that were upserted and the keys that were deleted.
+    """
+    with models.database.snapshot():
+        if since < database.get_changes_floor():
             raise exceptions.APIResponse(
-                status_code=HTTPStatus.BAD_REQUEST.real, detail=error.args[0]
+                status_code=HTTPStatus.GONE.real,
+                detail=f"Changes after {since} are no longer retained, use '/get-table' to resync",
             )
+        sequence, reset, latest = since, False, {}
+        for sequence, key, op in database.get_changes(table_name, since):
+            if op == "drop":
+                reset = True
+                latest.clear()
+            else:
+                latest[key] = op
+        upserted = [key for key, op in latest.items() if op == "upsert"]
+        encrypted = database.get_secrets(upserted, table_name) if upserted else {}
+    values = dict(zip(encrypted, crypto.decrypt(list(encrypted.values()))))
+    return {
+        "seq": sequence,
+        "reset": reset,
+        "upserts": values,
+        "deletes": [key for key in latest if key not in values],
+    }
+
+
+def encrypt_secrets(secrets: Dict[str, str]) -> Dict[str, bytes]:
+    """Encrypts multiple secrets to be stored in the database.
+
+    See Also:
+        This is a blocking call, that is meant to be run in the executor.
+
+    Args:
+        secrets: Key-value pairs of the secrets to be encrypted.
+
+    Returns:
+        Dict[str, bytes]:
+        Returns the key-value pairs for secret key and it's encrypted value.
+    """
+    return dict(zip(secrets, crypto.encrypt(list(secrets.values()))))
+
+
+async def retrieve_secrets(
+    table_name: str, keys: List[str] = None, version: int = None
+) -> Dict[str, str]:
+    """Retrieve multiple decrypted secrets from a table or retrieve the table as a whole.
+
+    Args:
+        table_name: Name of the table where the secret is stored.
+        keys: List of keys for which the values have to be retrieved.
+        version: Version of the table that the ETag was derived from.
+
+    Returns:
+        Dict[str, str]:
+        Returns the key-value pairs for secret key and it's decrypted value.
+    """
+    try:
+        if keys:
+            return await executor.run(decrypt_secrets, table_name, keys, version)
+        return await executor.run(decrypt_table, table_name)
+    except sqlite3.OperationalError as error:
+        LOGGER.error(error)
+        raise exceptions.APIResponse(
+            status_code=HTTPStatus.BAD_REQUEST.real, detail=error.args[0]
+        )
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Checks if the ETag matches any of the entity tags in the ``If-None-Match`` header, with weak comparison.
+
+    Args:
+        request: Reference to the FastAPI request object.
+        etag: ETag of the current representation.
+
+    Returns:
+        bool:
+        Returns a boolean flag to indicate whether the client already has the current representation.
+    """
+    if not (header := request.headers.get("if-none-match")):
+        return False
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == opaque
+        for candidate in header.split(",")
+    )
+
+
+def media_quality(accept: str, media_type: str) -> Tuple[int, float]:
+    """Looks up the quality value of a media type in the ``Accept`` header, from its most specific media range.
+
+    Args:
+        accept: Value of the ``Accept`` header.
+        media_type: Media type to look up, such as ``application/json``.
+
+    Returns:
+        Tuple[int, float]:
+        Returns the specificity of the matching range (2 for the exact type, 1 for ``type/*``, 0 for ``*/*`` and
+        -1 for no match), and its quality value between 0 and 1, where 0 means the media type is not acceptable.
+    """
+    main_type = media_type.split("/")[0]
+    match = (-1, 0.0)
+    for media_range in accept.lower().split(","):
+        name, *params = (part.strip() for part in media_range.split(";"))
+        if name == media_type:
+            specificity = 2
+        elif name == f"{main_type}/*":
+            specificity = 1
+        elif name == "*/*":
+            specificity = 0
+        else:
+            continue
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    quality = min(max(float(value), 0.0), 1.0)
+                except ValueError:
+                    quality = 0.0
+        if specificity > match[0]:
+            match = (specificity, quality)
+    return match
+
+
+def accepts_binary(request: Request) -> bool:
+    """Checks if the client asked for the binary transit format, and prefers it over JSON in ``Accept``.
+
+    Args:
+        request: Reference to the FastAPI request object.
+
+    Returns:
+        bool:
+        Returns a boolean flag to indicate whether the payload should be returned as ``application/octet-stream``.
+    """
+    if not (accept := request.headers.get("accept")):
+        return False
+    specificity, binary = media_quality(accept, "application/octet-stream")
+    # wildcards keep the JSON default, so the binary format is only served when it is named explicitly
+    return (
+        specificity == 2
+        and binary > 0
+        and binary >= media_quality(accept, "application/json")[1]
+    )
+
+
+async def check_etag(
+    request: Request, table_name: str, keys: List[str] = None
+) -> Tuple[int, Dict[str, str]]:
+    """Derives the ETag from the version of the table and the requested keys, and short-circuits when it matches.
+
+    See Also:
+        The version is read before the secrets, so a concurrent write can only make the ETag older than the
+        response, which results in a refetch rather than a stale 304. The version is also passed on to the
+        secret cache, so a cached secret from an older version is never labelled with this ETag.
+
+    Args:
+        request: Reference to the FastAPI request object.
+        table_name: Name of the table where the secrets are stored.
+        keys: List of keys that were requested, defaults to the whole table.
+
+    Raises:
+        APIResponse:
+        Raises the HTTPStatus object with 304, if the client already has the current representation.
+
+    Returns:
+        Tuple[int, Dict[str, str]]:
+        Returns the version of the table, and the ETag and Vary headers to be included in the response.
+    """
+    try:
+        version = await executor.run(database.get_version, table_name)
+    except sqlite3.OperationalError as error:
+        LOGGER.error(error)
+        raise exceptions.APIResponse(
+            status_code=HTTPStatus.BAD_REQUEST.real, detail=error.args[0]
+        )
+    identity = "\x00".join([table_name, str(version), *sorted(keys or [])])
+    # the body is transit encrypted afresh for every response, so the tag is weak
+    etag = f'W/"{hashlib.sha256(identity.encode()).hexdigest()[:32]}"'
+    if etag_matches(request, etag):
+        LOGGER.info("Table '%s' is unchanged at version %d", table_name, version)
+        raise exceptions.APIResponse(
+            status_code=HTTPStatus.NOT_MODIFIED.real,
+            detail=HTTPStatus.NOT_MODIFIED.phrase,
+            headers={"ETag": etag, "Vary": VARY},
+        )
+    return version, {"ETag": etag, "Vary": VARY}
+
+
+async def transit_response(
+    request: Request,
+    payload: Dict[str, Any],
+    status_code: int = HTTPStatus.OK.real,
+    headers: Dict[str, str] = None,
+) -> Response:
+    """Encrypts the payload in the transit format negotiated by the client.
+
+    See Also:
+        - ``Accept: application/octet-stream`` returns the raw nonce and ciphertext as the body, unless its quality
+          value is zero or lower than that of ``application/json``.
+        - Otherwise, the base64 encoded ciphertext is returned as the ``detail`` of a JSON body.
+        - ``X-Transit-Format: msgpack`` serializes the payload with msgpack instead of JSON, if installed.
+        - ``X-Transit-Encoding: zstd, zlib`` compresses payloads above the threshold before they are encrypted.
+
+    Args:
+        request: Reference to the FastAPI request object.
+        payload: Payload to be encrypted.
+        status_code: Status code of the response.
+        headers: Headers to be included in the response.
+
+    Returns:
+        Response:
+        Returns the encrypted payload as ``application/octet-stream`` for the binary format,
+        or as the ``detail`` of a JSON body for the default format.
+    """
+    headers = {**(headers or {}), "Vary": VARY}
+    serializer = request.headers.get("x-transit-format", "json").lower()
+    compression = codec.negotiate(request.headers.get("x-transit-encoding", ""))
+    if accepts_binary(request):
+        return Response(
+            content=await executor.run(
+                transit.encrypt, payload, False, serializer, compression
+            ),
+            status_code=status_code,
+            headers=headers,
+            media_type="application/octet-stream",
+        )
+    return responses.transit(
+        await executor.run(transit.encrypt, payload, True, serializer, compression),
+        status_code=status_code,
+        headers=headers,
+    )
 
 
 async def get_secret(
@@ -81,17 +409,12 @@ async def get_secret(
         APIResponse:
         Raises the HTTPStatus object with a status code and detail as response.
     """
-    await auth.validate(request, apikey)
-    if value := await retrieve_secret(key, table_name):
+    version, headers = await check_etag(request, table_name, [key])
+    if values := await retrieve_secrets(table_name, [key], version):
         LOGGER.info("Secret value for '%s' was retrieved", key)
-        decrypted = models.session.fernet.decrypt(value).decode(encoding="UTF-8")
-        raise exceptions.APIResponse(
-            status_code=HTTPStatus.OK.real, detail=transit.encrypt({key: decrypted})
-        )
+        return await transit_response(request, values, headers=headers)
     LOGGER.info("Secret value for '%s' NOT found in the datastore", key)
-    raise exceptions.APIResponse(
-        status_code=HTTPStatus.NOT_FOUND.real, detail=HTTPStatus.NOT_FOUND.phrase
-    )
+    return responses.not_found()
 
 
 async def get_secrets(
@@ -114,7 +437,6 @@ async def get_secrets(
         APIResponse:
         Raises the HTTPStatus object with a status code and detail as response.
     """
-    await auth.validate(request, apikey)
     # keys = [key.strip() for key in keys.split(",") if key.strip()]
     keys = list(filter(None, map(str.strip, keys.split(","))))
     keys_ct = len(keys)
@@ -125,7 +447,8 @@ async def get_secrets(
         raise exceptions.APIResponse(
             status_code=HTTPStatus.BAD_REQUEST.real, detail=error.args[0]
         )
-    if values := await retrieve_secrets(table_name, keys):
+    version, headers = await check_etag(request, table_name, keys)
+    if values := await retrieve_secrets(table_name, keys, version):
         values_ct = len(values)
         try:
             assert (
@@ -136,13 +459,7 @@ async def get_secrets(
         except AssertionError as error:
             LOGGER.warning(error)
             code = HTTPStatus.PARTIAL_CONTENT.real
-        decrypted = {
-            key: models.session.fernet.decrypt(value).decode(encoding="UTF-8")
-            for key, value in values.items()
-        }
-        raise exceptions.APIResponse(
-            status_code=code, detail=transit.encrypt(decrypted)
-        )
+        return await transit_response(request, values, code, headers)
     if keys_ct == 1:
         LOGGER.info("Secret value for '%s' NOT found in the datastore", keys[0])
     else:
@@ -151,14 +468,13 @@ async def get_secrets(
             keys_ct,
             keys,
         )
-    raise exceptions.APIResponse(
-        status_code=HTTPStatus.NOT_FOUND.real, detail=HTTPStatus.NOT_FOUND.phrase
-    )
+    return responses.not_found()
 
 
 async def get_table(
     request: Request,
     table_name: str = "default",
+    stream: bool = False,
     apikey: HTTPAuthorizationCredentials = Depends(security),
 ):
     """**API function to retrieve ALL the key-value pairs stored in a particular table.**
@@ -167,21 +483,62 @@ async def get_table(
 
         request: Reference to the FastAPI request object.
         table_name: Name of the table where the secrets are stored.
+        stream: Boolean flag to stream the table as individually encrypted frames, to keep memory usage flat.
         apikey: API Key to authenticate the request.
 
     **Raises:**
 
         APIResponse:
         Raises the HTTPStatus object with a status code and detail as response.
+
+    **Returns:**
+
+        StreamingResponse:
+        Returns the stream of frames as ``application/octet-stream``, when ``stream`` is set to ``true``.
     """
-    await auth.validate(request, apikey)
+    _, headers = await check_etag(request, table_name)
+    # sequence number of the change log to resume from with '/changes', read before the table content
+    headers["X-Changes-Seq"] = str(await executor.run(database.get_last_sequence))
+    if stream:
+        if not await executor.run(database.table_exists, table_name):
+            LOGGER.error("no such table: %s", table_name)
+            raise exceptions.APIResponse(
+                status_code=HTTPStatus.BAD_REQUEST.real,
+                detail=f"no such table: {table_name}",
+            )
+        LOGGER.info("Streaming the table '%s'", table_name)
+        return StreamingResponse(
+            transit.encrypt_stream(stream_table(table_name)),
+            media_type="application/octet-stream",
+            headers=headers,
+        )
     table_content = await retrieve_secrets(table_name)
-    decrypted = {
-        key: models.session.fernet.decrypt(value).decode(encoding="UTF-8")
-        for key, value in table_content.items()
-    }
-    raise exceptions.APIResponse(
-        status_code=HTTPStatus.OK.real, detail=transit.encrypt(decrypted)
+    return await transit_response(request, table_content, headers=headers)
+
+
+def write_error(
+    error: sqlite3.OperationalError, table_name: str
+) -> exceptions.APIResponse:
+    """Converts the error from a write into a response, that points to the migration for a legacy table.
+
+    Args:
+        error: Error raised by the write.
+        table_name: Name of the table that was written to.
+
+    Returns:
+        APIResponse:
+        Returns the HTTPStatus object with 409 for a table without the unique key index, or 400 otherwise.
+    """
+    LOGGER.error(error)
+    # upserts need the unique key index, which tables created with the legacy schema do not have
+    if "ON CONFLICT clause does not match" in error.args[0]:
+        return exceptions.APIResponse(
+            status_code=HTTPStatus.CONFLICT.real,
+            detail=f"Table '{table_name}' was created with a legacy schema, "
+            "run 'vaultapi migrate' to dedupe and re-index",
+        )
+    return exceptions.APIResponse(
+        status_code=HTTPStatus.BAD_REQUEST.real, detail=error.args[0]
     )
 
 
@@ -203,7 +560,6 @@ async def put_secret(
         APIResponse:
         Raises the HTTPStatus object with a status code and detail as response.
     """
-    await auth.validate(request, apikey)
     if await retrieve_secret(data.key, data.table_name):
         LOGGER.info("Secret value for '%s' will be overridden", data.key)
     else:
@@ -212,11 +568,20 @@ async def put_secret(
             data.key,
             data.table_name,
         )
-    encrypted = models.session.fernet.encrypt(data.value.encode(encoding="UTF-8"))
-    database.put_secret(key=data.key, value=encrypted, table_name=data.table_name)
-    raise exceptions.APIResponse(
-        status_code=HTTPStatus.OK.real, detail=HTTPStatus.OK.phrase
+    encrypted = await executor.run(
+        models.session.fernet.encrypt, data.value.encode(encoding="UTF-8")
     )
+    try:
+        await executor.run(
+            database.put_secret,
+            key=data.key,
+            value=encrypted,
+            table_name=data.table_name,
+        )
+    except sqlite3.OperationalError as error:
+        raise write_error(error, data.table_name)
+    watch.BROADCASTER.wake()
+    return responses.ok()
 
 
 async def put_secrets(
@@ -229,7 +594,7 @@ async def put_secrets(
     **Args:**
 
         request: Reference to the FastAPI request object.
-        data: Payload with ``key``, ``value``, and ``table_name`` as body.
+        data: Payload with ``secrets`` and ``table_name`` as body.
         apikey: API Key to authenticate the request.
 
     **Raises:**
@@ -237,13 +602,22 @@ async def put_secrets(
         APIResponse:
         Raises the HTTPStatus object with a status code and detail as response.
     """
-    await auth.validate(request, apikey)
-    for key, value in data.secrets.items():
-        encrypted = models.session.fernet.encrypt(value.encode(encoding="UTF-8"))
-        database.put_secret(key=key, value=encrypted, table_name=data.table_name)
-    raise exceptions.APIResponse(
-        status_code=HTTPStatus.OK.real, detail=HTTPStatus.OK.phrase
+    encrypted = await executor.run(encrypt_secrets, data.secrets)
+    try:
+        inserted, updated = await executor.run(
+            database.put_secrets, secrets=encrypted, table_name=data.table_name
+        )
+    except sqlite3.OperationalError as error:
+        raise write_error(error, data.table_name)
+    watch.BROADCASTER.wake()
+    LOGGER.info(
+        "Secret values for %d keys were stored to the table '%s' [inserted: %d, updated: %d]",
+        len(encrypted),
+        data.table_name,
+        inserted,
+        updated,
     )
+    return responses.ok()
 
 
 async def delete_secret(
@@ -264,7 +638,6 @@ async def delete_secret(
         APIResponse:
         Raises the HTTPStatus object with a status code and detail as response.
     """
-    await auth.validate(request, apikey)
     if await retrieve_secret(data.key, data.table_name):
         LOGGER.info("Secret value for '%s' will be removed", data.key)
     else:
@@ -272,10 +645,9 @@ async def delete_secret(
         raise exceptions.APIResponse(
             status_code=HTTPStatus.NOT_FOUND.real, detail=HTTPStatus.NOT_FOUND.phrase
         )
-    database.remove_secret(key=data.key, table_name=data.table_name)
-    raise exceptions.APIResponse(
-        status_code=HTTPStatus.OK.real, detail=HTTPStatus.OK.phrase
-    )
+    await executor.run(database.remove_secret, key=data.key, table_name=data.table_name)
+    watch.BROADCASTER.wake()
+    return responses.ok()
 
 
 async def create_table(
@@ -296,17 +668,144 @@ async def create_table(
         APIResponse:
         Raises the HTTPStatus object with a status code and detail as response.
     """
-    await auth.validate(request, apikey)
     try:
-        database.create_table(table_name, ["key", "value"])
+        await executor.run(database.create_table, table_name, ["key", "value"])
     except sqlite3.OperationalError as error:
         LOGGER.error(error)
         raise exceptions.APIResponse(
             status_code=HTTPStatus.EXPECTATION_FAILED.real, detail=error.args[0]
         )
-    raise exceptions.APIResponse(
-        status_code=HTTPStatus.OK.real, detail=HTTPStatus.OK.phrase
+    return responses.ok()
+
+
+async def get_changes(
+    request: Request,
+    table_name: str = "default",
+    since: NonNegativeInt = 0,
+    apikey: HTTPAuthorizationCredentials = Depends(security),
+):
+    """**API function to retrieve the changes to a table after a sequence number, to sync a copy of the table.**
+
+    **Args:**
+
+        request: Reference to the FastAPI request object.
+        table_name: Name of the table where the secrets are stored.
+        since: Sequence number of the last change that was applied, from ``seq`` or the ``X-Changes-Seq`` header.
+        apikey: API Key to authenticate the request.
+
+    **Raises:**
+
+        APIResponse:
+        Raises the HTTPStatus object with a status code and detail as response.
+    """
+    try:
+        changes = await executor.run(decrypt_changes, table_name, since)
+    except sqlite3.OperationalError as error:
+        LOGGER.error(error)
+        raise exceptions.APIResponse(
+            status_code=HTTPStatus.BAD_REQUEST.real, detail=error.args[0]
+        )
+    LOGGER.info(
+        "Changes to the table '%s' after %d were retrieved [upserts: %d, deletes: %d]",
+        table_name,
+        since,
+        len(changes["upserts"]),
+        len(changes["deletes"]),
     )
+    return await transit_response(request, changes)
+
+
+async def watch_table(
+    request: Request,
+    table_name: str = "default",
+    apikey: HTTPAuthorizationCredentials = Depends(security),
+):
+    """**API function to watch a table for changes, as server-sent events.**
+
+    **Args:**
+
+        request: Reference to the FastAPI request object.
+        table_name: Name of the table to be watched.
+        apikey: API Key to authenticate the request.
+
+    **Returns:**
+
+        StreamingResponse:
+        Returns the stream of ``change`` events as ``text/event-stream``, where each event's data is the transit
+        encrypted ``table_name`` and ``version``, starting with the current version of the table.
+    """
+    LOGGER.info("Watching the table '%s' for changes", table_name)
+    return StreamingResponse(
+        watch.events(table_name),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def cache_info(
+    request: Request,
+    apikey: HTTPAuthorizationCredentials = Depends(security),
+):
+    """**API function to retrieve the size and hit/miss counters of the secret cache.**
+
+    **Args:**
+
+        request: Reference to the FastAPI request object.
+        apikey: API Key to authenticate the request.
+
+    **Returns:**
+
+        Response:
+        Returns the cache info as the detail of the response.
+    """
+    return responses.detail(models.cache.info())
+
+
+async def rotation_status(
+    request: Request,
+    apikey: HTTPAuthorizationCredentials = Depends(security),
+):
+    """**API function to retrieve the progress of rotating the secrets to the primary key.**
+
+    **Args:**
+
+        request: Reference to the FastAPI request object.
+        apikey: API Key to authenticate the request.
+
+    **Returns:**
+
+        Response:
+        Returns the rotation progress of each table as the detail of the response.
+    """
+    return responses.detail(await executor.run(rotation.status))
+
+
+async def get_metrics(request: Request) -> PlainTextResponse:
+    """**API function to retrieve the metrics in the Prometheus text format.**
+
+    **Args:**
+
+        request: Reference to the FastAPI request object.
+
+    **Raises:**
+
+        APIResponse:
+        Raises the HTTPStatus object with a status code and detail as response, if the host is not allowed.
+
+    **Returns:**
+
+        PlainTextResponse:
+        Returns the request counts, latency histograms, stage timings and gauges.
+    """
+    if (
+        models.session.metrics_allowlist
+        and request.client.host not in models.session.metrics_allowlist
+    ):
+        LOGGER.info("Host: %s is not allowed to scrape metrics", request.client.host)
+        raise exceptions.APIResponse(
+            status_code=HTTPStatus.FORBIDDEN.real, detail=HTTPStatus.FORBIDDEN.phrase
+        )
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
 
 async def health() -> Dict[str, str]:
@@ -336,50 +835,71 @@ def get_all_routes() -> List[APIRoute]:
         List[APIRoute]:
         Returns the routes as a list of APIRoute objects.
     """
-    dependencies = [
-        Depends(dependency=rate_limit.RateLimiter(each_rate_limit).init)
-        for each_rate_limit in models.env.rate_limit
-    ]
     routes = [
         APIRoute(path="/", endpoint=docs, methods=["GET"], include_in_schema=False),
         APIRoute(
             path="/health", endpoint=health, methods=["GET"], include_in_schema=False
         ),
+        APIRoute(
+            path="/metrics",
+            endpoint=get_metrics,
+            methods=["GET"],
+            include_in_schema=False,
+        ),
         APIRoute(
             path="/get-secret",
             endpoint=get_secret,
             methods=["GET"],
-            dependencies=dependencies,
         ),
         APIRoute(
             path="/get-secrets",
             endpoint=get_secrets,
             methods=["GET"],
-            dependencies=dependencies,
         ),
         APIRoute(
             path="/get-table",
             endpoint=get_table,
             methods=["GET"],
-            dependencies=dependencies,
         ),
         APIRoute(
             path="/put-secret",
             endpoint=put_secret,
             methods=["PUT"],
-            dependencies=dependencies,
+        ),
+        APIRoute(
+            path="/put-secrets",
+            endpoint=put_secrets,
+            methods=["PUT"],
         ),
         APIRoute(
             path="/delete-secret",
             endpoint=delete_secret,
             methods=["DELETE"],
-            dependencies=dependencies,
         ),
         APIRoute(
             path="/create-table",
             endpoint=create_table,
             methods=["POST"],
-            dependencies=dependencies,
+        ),
+        APIRoute(
+            path="/changes",
+            endpoint=get_changes,
+            methods=["GET"],
+        ),
+        APIRoute(
+            path="/watch",
+            endpoint=watch_table,
+            methods=["GET"],
+        ),
+        APIRoute(
+            path="/cache-info",
+            endpoint=cache_info,
+            methods=["GET"],
+        ),
+        APIRoute(
+            path="/rotation-status",
+            endpoint=rotation_status,
+            methods=["GET"],
         ),
     ]
     return routes
@@ -1,59 +1,64 @@
 """Module that performs transit encryption/decryption.
 
 This allows the server to securely transmit the retrieved secret to be decrypted at the client side using the API key.
+
+The plaintext is encoded by the ``codec`` module, which describes its own format and optional compression.
 """
 
 import base64
-import hashlib
 import json
 import secrets
+import struct
 import time
-from typing import Any, ByteString, Dict
+from typing import Any, ByteString, Dict, Iterable, Iterator
 
 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 
-from . import models
+from . import metrics, models
+from .codec import KeyRing, deserialize, serialize
 
+# Stream frames are prefixed with the frame length and a flag for the final frame
+FRAME_HEADER = struct.Struct(">I?")
+# Sequence number and final flag of each frame are authenticated as associated data
+FRAME_AAD = struct.Struct(">Q?")
+KEYRING = KeyRing()
 
-def string_to_aes_key(input_string: str, key_length: int) -> ByteString:
-    """Hashes the string.
 
-    Args:
-        input_string: String for which an AES hash has to be generated.
-        key_length: AES key size used during encryption.
-
-    See Also:
-        AES supports three key lengths:
-            - 128 bits (16 bytes)
-            - 192 bits (24 bytes)
-            - 256 bits (32 bytes)
+def get_cipher() -> AESGCM:
+    """Get the cipher for the current transit time bucket.
 
     Returns:
-        str:
-        Return the first 16 bytes for the AES key
+        AESGCM:
+        Returns the memoized cipher object.
     """
-    hash_object = hashlib.sha256(input_string.encode())
-    return hash_object.digest()[:key_length]
+    epoch = int(time.time()) // models.env.transit_time_bucket
+    return KEYRING.get(epoch, models.env.apikey, models.env.transit_key_length)
 
 
-def encrypt(payload: Dict[str, Any], url_safe: bool = True) -> ByteString | str:
+@metrics.timed("transit_encrypt")
+def encrypt(
+    payload: Dict[str, Any],
+    url_safe: bool = True,
+    serializer: str = "json",
+    compression: str | None = None,
+) -> ByteString | str:
     """Encrypt a message using GCM mode with 12 fresh bytes.
 
     Args:
         payload: Payload to be encrypted.
         url_safe: Boolean flag to perform base64 encoding to perform JSON serialization.
+        serializer: Serializer for the payload, ``json`` or ``msgpack``.
+        compression: Compression algorithm for payloads above ``transit_compression_threshold`` bytes.
 
     Returns:
         ByteString | str:
         Returns the ciphertext as a string or bytes based on the ``url_safe`` flag.
     """
     nonce = secrets.token_bytes(12)
-    encoded = json.dumps(payload).encode()
-    epoch = int(time.time()) // models.env.transit_time_bucket
-    aes_key = string_to_aes_key(
-        f"{epoch}.{models.env.apikey}", models.env.transit_key_length
+    encoded = serialize(
+        payload, serializer, compression, models.env.transit_compression_threshold
     )
-    ciphertext = nonce + AESGCM(aes_key).encrypt(nonce, encoded, b"")
+    ciphertext = nonce + get_cipher().encrypt(nonce, encoded, b"")
     if url_safe:
         return base64.b64encode(ciphertext).decode("utf-8")
     return ciphertext
@@ -71,12 +76,89 @@ def decrypt(ciphertext: ByteString | str) -> Dict[str, Any]:
     """
     if isinstance(ciphertext, str):
         ciphertext = base64.b64decode(ciphertext)
-    epoch = int(time.time()) // models.env.transit_time_bucket
-    aes_key = string_to_aes_key(
-        f"{epoch}.{models.env.apikey}", models.env.transit_key_length
+    decrypted = get_cipher().decrypt(ciphertext[:12], ciphertext[12:], b"")
+    return deserialize(decrypted)
+
+
+def encrypt_frame(
+    cipher: AESGCM, payload: Dict[str, Any], sequence: int, final: bool
+) -> bytes:
+    """Encrypt a payload as an individually authenticated stream frame.
+
+    Args:
+        cipher: Cipher object for the stream.
+        payload: Payload to be encrypted.
+        sequence: Position of the frame in the stream.
+        final: Boolean flag to indicate the last frame of the stream.
+
+    Returns:
+        bytes:
+        Returns the frame header, followed by the nonce and the ciphertext.
+    """
+    nonce = secrets.token_bytes(12)
+    ciphertext = nonce + cipher.encrypt(
+        nonce, json.dumps(payload).encode(), FRAME_AAD.pack(sequence, final)
     )
-    decrypted = AESGCM(aes_key).decrypt(ciphertext[:12], ciphertext[12:], b"")
-    return json.loads(decrypted)
+    return FRAME_HEADER.pack(len(ciphertext), final) + ciphertext
+
+
+def encrypt_stream(payloads: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    """Encrypt an iterable of payloads as a stream of frames, terminated by an empty final frame.
+
+    See Also:
+        The cipher is pinned when the stream starts, so a stream that spans a transit time bucket can still be
+        decrypted as a whole. The sequence numbers and the final frame guard against reordering and truncation.
+
+    Args:
+        payloads: Iterable of payloads to be encrypted.
+
+    Yields:
+        bytes:
+        Yields each encrypted frame.
+    """
+    cipher = get_cipher()
+    sequence = 0
+    for payload in payloads:
+        yield encrypt_frame(cipher, payload, sequence, False)
+        sequence += 1
+    yield encrypt_frame(cipher, {}, sequence, True)
+
+
+def decrypt_stream(chunks: Iterable[ByteString]) -> Iterator[Dict[str, Any]]:
+    """Decrypt a stream of frames, as received in arbitrarily sized chunks.
+
+    Args:
+        chunks: Iterable of bytes received from the stream.
+
+    Raises:
+        Raises ``InvalidTag`` if using wrong key, or if a frame was corrupted, reordered or flagged incorrectly.
+        Raises ``ValueError`` if the stream ended before the final frame.
+
+    Yields:
+        Dict[str, Any]:
+        Yields the JSON serialized decrypted payload from each frame.
+    """
+    cipher = get_cipher()
+    buffer = bytearray()
+    sequence = 0
+    for chunk in chunks:
+        buffer.extend(chunk)
+        start = FRAME_HEADER.size
+        while len(buffer) >= start:
+            length, final = FRAME_HEADER.unpack_from(buffer)
+            end = start + length
+            if len(buffer) < end:
+                break
+            frame = bytes(buffer[start:end])
+            del buffer[:end]
+            decrypted = cipher.decrypt(
+                frame[:12], frame[12:], FRAME_AAD.pack(sequence, final)
+            )
+            if final:
+                return
+            sequence += 1
+            yield json.loads(decrypted)
+    raise ValueError("Stream ended before the final frame, response is truncated")
 
 
 if __name__ == "__main__":
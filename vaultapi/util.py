@@ -1,16 +1,11 @@
-import base64
-import hashlib
 import importlib
-import json
 import logging
 import sqlite3
-import time
-from typing import Any, ByteString, Dict
+from typing import Any, ByteString, Dict, Iterable, Iterator
 
-from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 from dotenv import dotenv_values
 
-from . import database, main, models
+from . import crypto, database, main, transit
 
 importlib.reload(logging)
 LOGGER = logging.getLogger(__name__)
@@ -29,35 +24,73 @@ def dotenv_to_table(
 ) -> None:
     """Store all the env vars from a .env file into the database.
 
+    See Also:
+        The env vars are validated and encrypted before the database is modified, and an existing table is
+        replaced within a single transaction, so a failure leaves the table as it was.
+
     Args:
         table_name: Name of the table to store secrets.
         dotenv_file: Dot env filename.
         drop_existing: Boolean flag to drop existing table.
+
+    Raises:
+        ValueError:
+        If any of the env vars does not have a value.
     """
     main.__init__(**kwargs)
-    if drop_existing:
-        LOGGER.info("Dropping table '%s' if available", table_name)
-        database.drop_table(table_name)
-        database.create_table(table_name, ["key", "value"])
-    else:
-        try:
-            if existing := database.get_table(table_name):
-                LOGGER.warning(
-                    "Table '%s' exists already. %d secrets will be overwritten",
-                    table_name,
-                    len(existing),
-                )
-        except sqlite3.OperationalError as error:
-            if str(error) == f"no such table: {table_name}":
-                LOGGER.info("Creating a new table %s", table_name)
-                database.create_table(table_name, ["key", "value"])
-            else:
-                raise
     env_vars = dotenv_values(dotenv_file)
-    for key, value in env_vars.items():
-        encrypted = models.session.fernet.encrypt(value.encode(encoding="UTF-8"))
-        database.put_secret(key, encrypted, table_name)
-    LOGGER.info("%d secrets have been stored to the database.", len(env_vars))
+    if missing := [key for key, value in env_vars.items() if value is None]:
+        raise ValueError(
+            f"\n\tEnv vars without a value in {dotenv_file!r}: {', '.join(missing)}"
+        )
+    encrypted = dict(zip(env_vars, crypto.encrypt(list(env_vars.values()))))
+    if drop_existing:
+        LOGGER.info("Replacing table '%s' if available", table_name)
+        database.replace_table(table_name, encrypted)
+        LOGGER.info("%d secrets have been stored to the database", len(env_vars))
+        return
+    try:
+        if existing := database.get_table(table_name):
+            LOGGER.warning(
+                "Table '%s' exists already. %d secrets will be overwritten",
+                table_name,
+                len(existing),
+            )
+    except sqlite3.OperationalError as error:
+        if str(error) == f"no such table: {table_name}":
+            LOGGER.info("Creating a new table %s", table_name)
+            database.create_table(table_name, ["key", "value"])
+        else:
+            raise
+    inserted, updated = database.put_secrets(encrypted, table_name)
+    LOGGER.info(
+        "%d secrets have been stored to the database [inserted: %d, updated: %d]",
+        len(env_vars),
+        inserted,
+        updated,
+    )
+
+
+def migrate(**kwargs) -> None:
+    """Dedupe and re-index all the tables in an existing database to the upsert schema.
+
+    See Also:
+        Databases created before the unique key index was introduced may contain duplicate rows for a key,
+        since every overwrite was appended as a new row. This retains only the latest value for each key.
+    """
+    main.__init__(**kwargs)
+    removed = 0
+    for table_name in database.get_tables():
+        duplicates = database.migrate_table(table_name)
+        LOGGER.info(
+            "Table '%s' has been indexed, %d duplicate rows were removed",
+            table_name,
+            duplicates,
+        )
+        removed += duplicates
+    if removed:
+        LOGGER.info("Vacuuming the database to reclaim space from %d rows", removed)
+        database.vacuum()
 
 
 def transit_decrypt(ciphertext: str | ByteString) -> Dict[str, Any]:
@@ -70,10 +103,17 @@ def transit_decrypt(ciphertext: str | ByteString) -> Dict[str, Any]:
         Dict[str, Any]:
         Returns the decrypted payload.
     """
-    epoch = int(time.time()) // models.env.transit_time_bucket
-    hash_object = hashlib.sha256(f"{epoch}.{models.env.apikey}".encode())
-    aes_key = hash_object.digest()[: models.env.transit_key_length]
-    if isinstance(ciphertext, str):
-        ciphertext = base64.b64decode(ciphertext)
-    decrypted = AESGCM(aes_key).decrypt(ciphertext[:12], ciphertext[12:], b"")
-    return json.loads(decrypted)
+    return transit.decrypt(ciphertext)
+
+
+def transit_decrypt_stream(chunks: Iterable[ByteString]) -> Iterator[Dict[str, Any]]:
+    """Decrypts a streamed response into payloads, one for each frame.
+
+    Args:
+        chunks: Iterable of bytes received from the stream.
+
+    Yields:
+        Dict[str, Any]:
+        Yields the decrypted payload from each frame.
+    """
+    yield from transit.decrypt_stream(chunks)
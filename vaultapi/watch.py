@@ -0,0 +1,163 @@
+"""Module that pushes table change notifications to the clients watching them, as server-sent events.
+
+A single broadcaster per worker polls the table versions while there are watchers, and is woken up right away by
+writes served by the same worker, so writes from other workers are picked up within ``watch_poll_interval``.
+Each change is transit encrypted once, and the same notification is fanned out to every watcher of the table.
+"""
+
+import asyncio
+import collections
+import logging
+from typing import AsyncIterator, Dict, Set, Tuple
+
+from . import database, executor, models, transit
+
+LOGGER = logging.getLogger("uvicorn.default")
+# Maximum number of notifications held for a slow watcher, older ones are dropped since versions only increase
+QUEUE_SIZE = 16
+
+
+class Broadcaster:
+    """Fans out the table change notifications to the watchers of each table.
+
+    >>> Broadcaster
+
+    """
+
+    def __init__(self):
+        """Instantiates the broadcaster without any watchers.
+
+        Attributes:
+            subscribers: Queues of the watchers for each table.
+            versions: Versions of the tables as of the last poll, or None when no one is watching.
+            wakeup: Event that triggers the next poll, ahead of the poll interval.
+            task: Task that polls the versions, while there are watchers.
+        """
+        self.subscribers: Dict[str, Set[asyncio.Queue]] = collections.defaultdict(set)
+        self.versions: Dict[str, int] | None = None
+        self.wakeup = asyncio.Event()
+        self.task: asyncio.Task | None = None
+
+    def wake(self) -> None:
+        """Triggers a poll right away, after a write to the database."""
+        if self.task is not None:
+            self.wakeup.set()
+
+    async def subscribe(self, table_name: str) -> asyncio.Queue:
+        """Adds a watcher for the table, and starts polling if this is the first watcher.
+
+        See Also:
+            The versions are snapshotted before the queue is returned, so any write after the subscription is
+            notified, while the caller reads the current version to cover the writes before it.
+
+        Args:
+            table_name: Name of the table to be watched.
+
+        Returns:
+            asyncio.Queue:
+            Returns the queue that receives the version and the encrypted notification for each change.
+        """
+        if self.versions is None:
+            self.versions = await executor.run(database.get_versions)
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.subscribers[table_name].add(queue)
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+        return queue
+
+    def unsubscribe(self, table_name: str, queue: asyncio.Queue) -> None:
+        """Removes a watcher for the table.
+
+        Args:
+            table_name: Name of the table that was watched.
+            queue: Queue of the watcher.
+        """
+        self.subscribers[table_name].discard(queue)
+        if not self.subscribers[table_name]:
+            del self.subscribers[table_name]
+
+    def publish(self, table_name: str, message: Tuple[int, str]) -> None:
+        """Puts the notification in the queue of every watcher of the table, dropping the oldest when full.
+
+        Args:
+            table_name: Name of the table that was changed.
+            message: Version of the table and the encrypted notification.
+        """
+        for queue in self.subscribers.get(table_name, ()):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(message)
+
+    async def poll(self) -> None:
+        """Compares the table versions with the last poll, and notifies the watchers of the changed tables."""
+        versions = await executor.run(database.get_versions)
+        for table_name, version in versions.items():
+            if self.versions.get(table_name) == version:
+                continue
+            if table_name in self.subscribers:
+                notification = await executor.run(
+                    transit.encrypt, {"table_name": table_name, "version": version}
+                )
+                self.publish(table_name, (version, notification))
+        self.versions = versions
+
+    async def run(self) -> None:
+        """Polls the table versions until there are no watchers left."""
+        while self.subscribers:
+            try:
+                await asyncio.wait_for(
+                    self.wakeup.wait(), models.env.watch_poll_interval
+                )
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+            try:
+                await self.poll()
+            except Exception as error:
+                LOGGER.error("Failed to poll the table versions: %s", error)
+        self.task = None
+        self.versions = None
+
+
+BROADCASTER = Broadcaster()
+
+
+def event(version: int, notification: str) -> str:
+    """Formats a notification as a server-sent event, with the version as the event ID."""
+    return f"id: {version}\nevent: change\ndata: {notification}\n\n"
+
+
+async def events(table_name: str) -> AsyncIterator[str]:
+    """Generates the server-sent events for a watcher of the table.
+
+    See Also:
+        The first event carries the current version of the table, and a comment is sent as a heartbeat
+        when nothing has changed for ``watch_heartbeat`` seconds, to keep the connection from timing out.
+
+    Args:
+        table_name: Name of the table to be watched.
+
+    Yields:
+        str:
+        Yields each event with the transit encrypted ``table_name`` and ``version``.
+    """
+    queue = await BROADCASTER.subscribe(table_name)
+    try:
+        version = await executor.run(database.get_version, table_name)
+        yield event(
+            version,
+            await executor.run(
+                transit.encrypt, {"table_name": table_name, "version": version}
+            ),
+        )
+        while True:
+            try:
+                version, notification = await asyncio.wait_for(
+                    queue.get(), models.env.watch_heartbeat
+                )
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            yield event(version, notification)
+    finally:
+        BROADCASTER.unsubscribe(table_name, queue)